@@ -1,19 +1,41 @@
 """Flask application for Emoji Zork."""
 
+import os
 import secrets
 import time
-import uuid
+from collections import OrderedDict, deque
 from functools import wraps
 
+import orjson
 from flask import Flask, jsonify, request, send_from_directory
+from flask.json.provider import JSONProvider
 
 from game_engine import GameEngine
 
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson, so jsonify encodes straight to bytes."""
+
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype=self.mimetype)
+
+
 app = Flask(__name__, static_folder="static", static_url_path="")
+app.json = OrjsonProvider(app)
 
 # Secure session configuration
 app.config.update(
-    SECRET_KEY=secrets.token_hex(32),
+    # A fixed key keeps signed data valid across restarts and workers
+    SECRET_KEY=os.environ.get("FLASK_SECRET_KEY") or secrets.token_hex(32),
     MAX_CONTENT_LENGTH=1024,  # 1KB max request
 )
 
@@ -23,41 +45,67 @@ MAX_SESSIONS = 1000
 
 # Rate limiting configuration
 RATE_LIMIT = 60  # requests per minute
-rate_limit_store: dict[str, list] = {}
+# IP -> request timestamps in the window, ordered by each IP's latest request
+rate_limit_store: OrderedDict[str, deque[float]] = OrderedDict()
+
+# Headers added to every response
+SECURITY_HEADERS = {
+    "X-Frame-Options": "DENY",
+    "X-Content-Type-Options": "nosniff",
+    "X-XSS-Protection": "1; mode=block",
+    "Content-Security-Policy": (
+        "default-src 'self'; "
+        "script-src 'self'; "
+        "style-src 'self' 'unsafe-inline'; "
+        "img-src 'self' data:; "
+        "font-src 'self'; "
+        "connect-src 'self'; "
+        "frame-ancestors 'none';"
+    ),
+    "Referrer-Policy": "strict-origin-when-cross-origin",
+}
 
-# In-memory game sessions with timestamps
-game_sessions: dict[str, dict] = {}
+# In-memory game sessions, least recently used first
+game_sessions: OrderedDict[str, dict] = OrderedDict()
 game_engine = GameEngine()
 
 
-def cleanup_expired_sessions():
-    """Remove expired sessions."""
-    current_time = time.time()
-    expired = [
-        sid
-        for sid, data in game_sessions.items()
-        if current_time - data.get("created_at", 0) > SESSION_TTL
-    ]
-    for sid in expired:
-        del game_sessions[sid]
+def get_live_session(session_id: str | None) -> dict | None:
+    """Look up a session, expiring it lazily once its TTL has passed."""
+    session = game_sessions.get(session_id) if session_id else None
+    if session is None:
+        return None
+    if time.time() - session["created_at"] > SESSION_TTL:
+        del game_sessions[session_id]
+        return None
+    game_sessions.move_to_end(session_id)
+    return session
 
 
 def check_rate_limit(ip: str) -> bool:
     """Check if IP has exceeded rate limit. Returns True if allowed."""
     current_time = time.time()
+    cutoff = current_time - 60
+
+    # Forget IPs with no requests left in the window (least recent first)
+    while rate_limit_store:
+        oldest = next(iter(rate_limit_store.values()))
+        if oldest and oldest[-1] > cutoff:
+            break
+        rate_limit_store.popitem(last=False)
 
     # Clean old entries
-    if ip in rate_limit_store:
-        rate_limit_store[ip] = [
-            t for t in rate_limit_store[ip] if current_time - t < 60
-        ]
+    timestamps = rate_limit_store.setdefault(ip, deque(maxlen=RATE_LIMIT))
+    while timestamps and timestamps[0] <= cutoff:
+        timestamps.popleft()
 
     # Check limit
-    if len(rate_limit_store.get(ip, [])) >= RATE_LIMIT:
+    if len(timestamps) >= RATE_LIMIT:
         return False
 
     # Record request
-    rate_limit_store.setdefault(ip, []).append(current_time)
+    timestamps.append(current_time)
+    rate_limit_store.move_to_end(ip)
     return True
 
 
@@ -77,19 +125,7 @@ def rate_limited(f):
 @app.after_request
 def add_security_headers(response):
     """Add security headers to all responses."""
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    response.headers["Content-Security-Policy"] = (
-        "default-src 'self'; "
-        "script-src 'self'; "
-        "style-src 'self' 'unsafe-inline'; "
-        "img-src 'self' data:; "
-        "font-src 'self'; "
-        "connect-src 'self'; "
-        "frame-ancestors 'none';"
-    )
-    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+    response.headers.update(SECURITY_HEADERS)
     return response
 
 
@@ -103,14 +139,12 @@ def index():
 @rate_limited
 def new_game():
     """Start a new game session."""
-    # Cleanup expired sessions periodically
-    cleanup_expired_sessions()
+    # Limit total sessions to prevent memory exhaustion by evicting the
+    # least recently used ones
+    while len(game_sessions) >= MAX_SESSIONS:
+        game_sessions.popitem(last=False)
 
-    # Limit total sessions to prevent memory exhaustion
-    if len(game_sessions) >= MAX_SESSIONS:
-        return jsonify({"error": "🚫"}), 503
-
-    session_id = str(uuid.uuid4())
+    session_id = secrets.token_hex(16)
     state = game_engine.new_game()
     game_sessions[session_id] = {
         "state": state,
@@ -137,10 +171,10 @@ def action():
     action_type = data.get("action")
 
     # Validate session
-    if not session_id or session_id not in game_sessions:
+    session = get_live_session(session_id)
+    if session is None:
         return jsonify({"error": "❓"}), 400
 
-    session = game_sessions[session_id]
     state = session["state"]
 
     # Build params from request
@@ -150,8 +184,9 @@ def action():
     if "item" in data:
         params["item"] = data["item"]
 
-    # Perform action
+    # Perform action (mutates state, so the cached /api/state body is stale)
     result = game_engine.perform_action(state, action_type, params)
+    session.pop("state_response", None)
 
     response = {
         "success": result.success,
@@ -176,17 +211,21 @@ def get_state():
     """Get current game state."""
     session_id = request.args.get("session_id")
 
-    if not session_id or session_id not in game_sessions:
+    session = get_live_session(session_id)
+    if session is None:
         return jsonify({"error": "❓"}), 400
 
-    session = game_sessions[session_id]
-    state = session["state"]
-
-    return jsonify(
-        {
-            "state": game_engine.get_state_for_client(state),
-        }
-    )
+    # Polling clients re-read an unchanged state - serialize it once per action
+    body = session.get("state_response")
+    if body is None:
+        body = jsonify(
+            {
+                "state": game_engine.get_state_for_client(session["state"]),
+            }
+        ).get_data()
+        session["state_response"] = body
+
+    return app.response_class(body, mimetype=app.json.mimetype)
 
 
 if __name__ == "__main__":
@@ -14,6 +14,9 @@ VALID_ACTIONS = frozenset({"move", "look", "take", "attack", "use"})
 VALID_DIRECTIONS = frozenset({"⬆️", "⬇️", "⬅️", "➡️"})
 VALID_ITEMS = frozenset(ITEMS.keys())
 
+# The sword is the only weapon, so its damage is fixed for the whole process
+SWORD_DAMAGE = ITEMS["🗡️"]["damage"]
+
 
 class GameEngine:
     """Manages game state and logic."""
@@ -214,7 +217,7 @@ class GameEngine:
         enemy = alive_enemies[0]
 
         # Player attacks
-        damage = ITEMS["🗡️"]["damage"]
+        damage = SWORD_DAMAGE
         enemy.take_damage(damage)
 
         event_data = {"enemy": enemy.emoji, "damage_dealt": damage}
@@ -1,9 +1,11 @@
 """Data models for Emoji Zork game."""
 
+from collections.abc import Mapping
 from dataclasses import dataclass, field
+from types import MappingProxyType
 
 
-@dataclass
+@dataclass(slots=True)
 class Enemy:
     """Represents an enemy in the game."""
 
@@ -33,9 +35,13 @@ class Enemy:
         )
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Room:
-    """Represents a room in the game world."""
+    """Represents a room in the game world.
+
+    Rooms are built once per engine and shared by every game; per-game items
+    and enemies live on GameState.
+    """
 
     id: str
     emoji: str
@@ -49,13 +55,13 @@ class Room:
         """Check if room has an exit in the given direction."""
         return direction in self.exits or direction in self.locked_exits
 
-    def get_available_exits(self, unlocked: set) -> dict[str, str]:
+    def get_available_exits(self, unlocked: set) -> Mapping[str, str]:
         """Get all currently available exits."""
-        exits = dict(self.exits)
-        for direction, room_id in self.locked_exits.items():
-            if room_id in unlocked:
-                exits[direction] = room_id
-        return exits
+        opened = {d: r for d, r in self.locked_exits.items() if r in unlocked}
+        if not opened:
+            # Read-only view, so the shared world's exits are never copied
+            return MappingProxyType(self.exits)
+        return {**self.exits, **opened}
 
 
 @dataclass
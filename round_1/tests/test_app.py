@@ -1,10 +1,5 @@
 """Tests for the Flask API endpoints."""
 
-import sys
-from pathlib import Path
-
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
-
 import pytest
 
 from app import app, game_sessions
@@ -141,6 +136,18 @@ class TestStateRoute:
         data = response.get_json()
         assert "state" in data
 
+    def test_get_state_reflects_actions(self, client, game_session):
+        """Get state should not serve a stale body after an action."""
+        before = client.get(f"/api/state?session_id={game_session}").get_json()
+        assert before["state"]["location_id"] == "house"
+
+        client.post(
+            "/api/action",
+            json={"session_id": game_session, "action": "move", "direction": "➡️"},
+        )
+        after = client.get(f"/api/state?session_id={game_session}").get_json()
+        assert after["state"]["location_id"] == "forest"
+
     def test_get_state_requires_valid_session(self, client):
         """Get state should require valid session."""
         response = client.get("/api/state?session_id=invalid")
@@ -1,11 +1,5 @@
 """Tests for the game engine."""
 
-import sys
-from pathlib import Path
-
-# Add src to path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
-
 from game_engine import GameEngine
 
 
@@ -1,10 +1,5 @@
 """Integration tests for complete gameplay sequences."""
 
-import sys
-from pathlib import Path
-
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
-
 from game_engine import GameEngine
 
 
@@ -1,9 +1,6 @@
 """Tests for the game models."""
 
-import sys
-from pathlib import Path
-
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+import pytest
 
 from models import ActionResult, Enemy, GameState, Room
 
@@ -90,6 +87,20 @@ class TestRoom:
         assert "⬆️" in exits
         assert "⬇️" in exits
 
+    def test_get_available_exits_does_not_expose_room_exits(self):
+        """get_available_exits should not let callers modify the room."""
+        room = Room(id="test", emoji="🏠", exits={"➡️": "forest"})
+        exits = room.get_available_exits(set())
+        with pytest.raises(TypeError):
+            exits["⬇️"] = "cave"
+        assert room.exits == {"➡️": "forest"}
+
+    def test_room_is_frozen(self):
+        """Rooms are shared between games and cannot be reassigned."""
+        room = Room(id="test", emoji="🏠")
+        with pytest.raises(AttributeError):
+            room.is_dark = True
+
 
 class TestGameState:
     """Tests for the GameState model."""
@@ -1,51 +1,48 @@
 """Security tests for Emoji Zork."""
 
-import sys
-from pathlib import Path
-
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
-
 import time
+from collections import deque
 
-from app import MAX_SESSIONS, app, cleanup_expired_sessions, game_sessions
+from app import MAX_SESSIONS, app, game_sessions
 
 
 class TestSecurityHeaders:
     """Tests for security headers."""
 
-    def setup_method(self):
-        self.client = app.test_client()
-        game_sessions.clear()
+    @classmethod
+    def setup_class(cls):
+        # Headers don't depend on session state, so one response covers them all
+        cls.client = app.test_client()
+        cls.resp = cls.client.get("/")
 
     def test_x_frame_options_header(self):
         """X-Frame-Options should be DENY."""
-        resp = self.client.get("/")
-        assert resp.headers.get("X-Frame-Options") == "DENY"
+        assert self.resp.headers.get("X-Frame-Options") == "DENY"
 
     def test_x_content_type_options_header(self):
         """X-Content-Type-Options should be nosniff."""
-        resp = self.client.get("/")
-        assert resp.headers.get("X-Content-Type-Options") == "nosniff"
+        assert self.resp.headers.get("X-Content-Type-Options") == "nosniff"
 
     def test_csp_header_present(self):
         """Content-Security-Policy should be set."""
-        resp = self.client.get("/")
-        csp = resp.headers.get("Content-Security-Policy")
+        csp = self.resp.headers.get("Content-Security-Policy")
         assert csp is not None
         assert "default-src 'self'" in csp
         assert "frame-ancestors 'none'" in csp
 
     def test_referrer_policy_header(self):
         """Referrer-Policy should be strict."""
-        resp = self.client.get("/")
-        assert "strict-origin" in resp.headers.get("Referrer-Policy", "")
+        assert "strict-origin" in self.resp.headers.get("Referrer-Policy", "")
 
 
 class TestInputValidation:
     """Tests for input validation."""
 
+    @classmethod
+    def setup_class(cls):
+        cls.client = app.test_client()
+
     def setup_method(self):
-        self.client = app.test_client()
         game_sessions.clear()
 
     def test_invalid_action_rejected(self):
@@ -104,8 +101,11 @@ class TestInputValidation:
 class TestSessionSecurity:
     """Tests for session management."""
 
+    @classmethod
+    def setup_class(cls):
+        cls.client = app.test_client()
+
     def setup_method(self):
-        self.client = app.test_client()
         game_sessions.clear()
 
     def test_invalid_session_rejected(self):
@@ -127,8 +127,8 @@ class TestSessionSecurity:
         assert "created_at" in game_sessions[session_id]
         assert isinstance(game_sessions[session_id]["created_at"], float)
 
-    def test_session_limit_enforced(self):
-        """Should reject new sessions when limit reached."""
+    def test_session_limit_evicts_oldest(self):
+        """Should evict the least recently used session when limit reached."""
         # Fill up sessions
         for i in range(MAX_SESSIONS):
             game_sessions[f"session-{i}"] = {
@@ -137,25 +137,47 @@ class TestSessionSecurity:
             }
 
         resp = self.client.post("/api/new-game")
-        assert resp.status_code == 503
+        assert resp.status_code == 200
+        assert len(game_sessions) == MAX_SESSIONS
+        assert "session-0" not in game_sessions
+
+    def test_used_session_not_evicted(self):
+        """Accessing a session should protect it from eviction."""
+        resp = self.client.post("/api/new-game")
+        session_id = resp.get_json()["session_id"]
+        for i in range(MAX_SESSIONS - 1):
+            game_sessions[f"session-{i}"] = {
+                "state": None,
+                "created_at": time.time(),
+            }
+
+        self.client.get(f"/api/state?session_id={session_id}")
+        self.client.post("/api/new-game")
+        assert session_id in game_sessions
+        assert "session-0" not in game_sessions
 
     def test_expired_sessions_cleaned(self):
-        """Expired sessions should be cleaned up."""
-        # Create an expired session
-        game_sessions["expired-session"] = {
-            "state": None,
-            "created_at": time.time() - 7200,  # 2 hours ago
-        }
+        """Expired sessions should be rejected and removed on access."""
+        resp = self.client.post("/api/new-game")
+        session_id = resp.get_json()["session_id"]
+        game_sessions[session_id]["created_at"] = time.time() - 7200
 
-        cleanup_expired_sessions()
-        assert "expired-session" not in game_sessions
+        resp = self.client.post(
+            "/api/action",
+            json={"session_id": session_id, "action": "look"},
+        )
+        assert resp.status_code == 400
+        assert session_id not in game_sessions
 
 
 class TestRateLimiting:
     """Tests for rate limiting."""
 
+    @classmethod
+    def setup_class(cls):
+        cls.client = app.test_client()
+
     def setup_method(self):
-        self.client = app.test_client()
         game_sessions.clear()
 
     def test_rate_limit_returns_429(self):
@@ -164,7 +186,7 @@ class TestRateLimiting:
 
         # Simulate hitting rate limit
         test_ip = "test-ip"
-        rate_limit_store[test_ip] = [time.time()] * (RATE_LIMIT + 1)
+        rate_limit_store[test_ip] = deque([time.time()] * (RATE_LIMIT + 1))
 
         # This would normally check the IP, but in test mode
         # we can verify the logic works
@@ -172,12 +194,25 @@ class TestRateLimiting:
 
         assert check_rate_limit(test_ip) is False
 
+    def test_idle_ips_forgotten(self):
+        """IPs with no requests left in the window should be dropped."""
+        from app import check_rate_limit, rate_limit_store
+
+        rate_limit_store.clear()
+        rate_limit_store["idle-ip"] = deque([time.time() - 120])
+
+        assert check_rate_limit("active-ip") is True
+        assert list(rate_limit_store) == ["active-ip"]
+
 
 class TestGameStateIntegrity:
     """Tests for game state integrity."""
 
+    @classmethod
+    def setup_class(cls):
+        cls.client = app.test_client()
+
     def setup_method(self):
-        self.client = app.test_client()
         game_sessions.clear()
 
     def test_cannot_cheat_health(self):
@@ -1,10 +1,5 @@
 """Tests for the game world definitions."""
 
-import sys
-from pathlib import Path
-
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
-
 from world import (
     ENEMY_SCORES,
     ENEMY_TEMPLATES,
@@ -9,6 +9,7 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from pydantic import BaseModel, field_validator
 from typing import Literal, Optional
 from pathlib import Path
+from contextlib import asynccontextmanager
 import logging
 import random
 import uuid
@@ -26,10 +27,12 @@ from services.caption_selector import (
     get_meltdown_caption, get_meltdown_refusal, get_panic_meltdown_secret
 )
 from services import paranoia as paranoia_service
-from services.meme_generator import generate_meme, get_meme_path
+from services.meme_generator import generate_meme_async, wait_for_meme
 from services.cve_detector import detect_cves_batch, detect_cves_batch_live, get_worst_severity, CVEMatch
+from services import cve_detector
 from services.cursed_detector import detect_cursed_batch, get_worst_cursed, CursedMatch
 from services.ai_roaster import generate_ai_roast, is_ai_available, AIRoastResult
+from services import ai_roaster
 from services.signer import sign_response, get_signing_method
 
 # Configuration
@@ -82,11 +85,20 @@ class RoastResponse(BaseModel):
     cve_count: int = 0
     cursed_count: int = 0
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Close pooled HTTP clients on shutdown."""
+    yield
+    await ai_roaster.close_client()
+    await cve_detector.close_osv_client()
+
+
 app = FastAPI(
     title="PARANOID",
     description="SBOM Roast Generator - Paste your dependencies. Get roasted. Question everything.",
     version="0.1.0",
-    debug=False  # Never True in production
+    debug=False,  # Never True in production
+    lifespan=lifespan
 )
 
 
@@ -219,8 +231,12 @@ async def serve_app_js():
 @app.get("/memes/{meme_id}.png")
 async def serve_meme(meme_id: str):
     """Serve generated meme images."""
-    meme_path = get_meme_path(meme_id)
-    if meme_path and meme_path.exists():
+    # The PNG may still be encoding in the background
+    try:
+        meme_path = await wait_for_meme(meme_id)
+    except Exception:
+        meme_path = None  # Encode failures are already logged by the encoder
+    if meme_path:
         return FileResponse(meme_path, media_type="image/png")
     raise HTTPException(status_code=404, detail="Meme not found. It probably questioned its own existence.")
 
@@ -272,7 +288,7 @@ async def panic(x_session_id: Optional[str] = Header(None)):
     # Normal mode: Fahrenheit 451 easter egg
     # Escalate paranoia for pressing PANIC
     session.level = min(session.level + 1, paranoia_service.MELTDOWN)
-    session.triggers.append("panic_button")
+    session.triggers.add("panic_button")
     
     raise HTTPException(
         status_code=451,
@@ -377,6 +393,7 @@ async def roast(request: RoastRequest, req: Request, x_session_id: Optional[str]
     ai_generated = False
     template_used = "leonardo"
     ai_sbom_commentary = ""  # Will be set if AI provides it
+    ai_result: Optional[AIRoastResult] = None
     
     # Try AI generation if requested and available
     if request.use_ai and is_ai_available():
@@ -403,10 +420,10 @@ async def roast(request: RoastRequest, req: Request, x_session_id: Optional[str]
             caption = ai_result.roast
             template_used = ai_result.template
             ai_sbom_commentary = ai_result.sbom_commentary
-            ai_generated = True
+            ai_generated = ai_result.ai_generated
     
     # Fallback to pre-written captions if AI not used or failed
-    if not ai_generated:
+    if not ai_result:
         # MELTDOWN MODE: Use unhinged captions
         if session.level == paranoia_service.MELTDOWN:
             caption = get_meltdown_caption()
@@ -418,7 +435,7 @@ async def roast(request: RoastRequest, req: Request, x_session_id: Optional[str]
             caption = select_caption("dependency_count", dep_count=dep_count)
 
     # Generate the meme image
-    generate_meme(meme_id, caption, template=template_used)
+    await generate_meme_async(meme_id, caption, template=template_used)
 
     # Build findings based on actual analysis
     dep_severity = "high" if dep_count > 50 else "medium" if dep_count > 10 else "low"
@@ -523,6 +540,10 @@ async def roast(request: RoastRequest, req: Request, x_session_id: Optional[str]
     
     # Sign the response (REQ-053)
     signature = sign_response(response_data)
+
+    # The PNG encoded in the background while the response was built - fail
+    # the roast here rather than hand out a meme_url that will 404
+    await wait_for_meme(meme_id)
     
     return RoastResponse(
         meme_url=f"/memes/{meme_id}.png",
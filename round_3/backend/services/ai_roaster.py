@@ -2,9 +2,19 @@
 # Generates personalized roasts and selects meme templates
 
 import os
-import json
+import asyncio
+import concurrent.futures
+import hashlib
+import random
+import sys
+import threading
+import time
 import httpx
+import orjson
 import logging
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import islice
 from dataclasses import dataclass
 from typing import Optional
 
@@ -14,6 +24,19 @@ logger = logging.getLogger(__name__)
 ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY")
 ANTHROPIC_API_URL = "https://api.anthropic.com/v1/messages"
 AI_TIMEOUT = 15  # seconds (increased for better models)
+AI_MAX_CONCURRENCY = int(os.environ.get("AI_MAX_CONCURRENCY", "8"))  # Max in-flight API calls per event loop (rate limits)
+AI_MAX_RETRIES = 2  # Extra attempts after a 429/503/timeout, all within AI_TIMEOUT
+AI_SYNC_TIMEOUT = AI_TIMEOUT + 5  # seconds generate_ai_roast_sync waits before giving up
+AI_ATTEMPT_TIMEOUT = 8  # seconds - per-attempt cap, so a timed-out first try leaves room to retry
+AI_RETRY_BASE_DELAY = 0.2  # seconds, doubled per retry
+AI_RETRY_JITTER = 0.05  # seconds, +/- so concurrent retries don't stampede
+RETRYABLE_STATUS_CODES = frozenset({429, 503})
+PROMPT_DESCRIPTION_CHARS = 80  # Finding descriptions are truncated to save input tokens
+PROMPT_MAX_CVES = 20  # CVE lines listed in the prompt; the rest are summarized as a count
+PROMPT_MAX_CURSED = 20  # Same cap for cursed packages
+PROMPT_MAX_PACKAGES = 50  # Package names sampled into the prompt
+ROAST_CACHE_TTL = 300  # seconds - matches Anthropic's prompt cache window
+ROAST_CACHE_MAX_SIZE = 256
 
 # Model mapping by reasoning level
 AI_MODELS = {
@@ -23,6 +46,77 @@ AI_MODELS = {
 }
 AI_MODEL = os.environ.get("AI_MODEL", AI_MODELS["medium"])  # Default fallback
 
+# Completion budget by reasoning level - roasts are ~150 bytes of JSON
+AI_MAX_TOKENS = {
+    "low": 256,
+    "medium": 512,
+    "high": 512,
+}
+
+# Shared HTTP clients (one per event loop) - keeps TLS connections to the API warm
+_clients: dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+# API call slots (one semaphore per event loop) - excess callers queue instead of piling onto the API
+_api_slots: dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+
+# Finished roasts keyed by findings_key() -> (stored_at, result), oldest first
+_roast_cache: OrderedDict[str, tuple[float, "AIRoastResult"]] = OrderedDict()
+
+# In-flight roast requests keyed by roast_key(), for request coalescing
+_inflight_roasts: dict[str, asyncio.Future] = {}
+
+
+def _drop_closed_loops() -> None:
+    """Forget the clients and slots of event loops that have been closed.
+
+    Loops from asyncio.run() would otherwise pile up here with their
+    clients. A closed loop can't run aclose() any more, so dropping the
+    references is what releases the connections. A WeakKeyDictionary
+    wouldn't help - the client and semaphore reference their loop.
+    """
+    for registry in (_clients, _api_slots):
+        for loop in [loop for loop in registry if loop.is_closed()]:
+            del registry[loop]
+
+
+def get_client() -> httpx.AsyncClient:
+    """Get the pooled Anthropic API client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        _drop_closed_loops()  # A new loop is a good moment to sweep out dead ones
+        client = httpx.AsyncClient(
+            timeout=AI_TIMEOUT,
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=10, max_connections=20),
+            headers={
+                "x-api-key": ANTHROPIC_API_KEY or "",
+                "anthropic-version": "2023-06-01",
+                "content-type": "application/json"
+            }
+        )
+        _clients[loop] = client
+    return client
+
+
+def get_api_slots() -> asyncio.Semaphore:
+    """Get the semaphore bounding concurrent API calls on the running event loop."""
+    loop = asyncio.get_running_loop()
+    slots = _api_slots.get(loop)
+    if slots is None:
+        _drop_closed_loops()
+        slots = _api_slots[loop] = asyncio.Semaphore(AI_MAX_CONCURRENCY)
+    return slots
+
+
+async def close_client() -> None:
+    """Close the pooled client for the running event loop (app shutdown)."""
+    loop = asyncio.get_running_loop()
+    _api_slots.pop(loop, None)
+    client = _clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+
 
 def mask_api_key(key: str | None) -> str:
     """M-4 Security: Mask API key for safe logging."""
@@ -76,89 +170,22 @@ MEME_TEMPLATES = {
 }
 
 
-@dataclass
-class AIRoastResult:
-    """Result from AI roast generation."""
-    roast: str
-    template: str
-    severity: str
-    sbom_commentary: str = ""  # AI-generated SBOM analysis
-    ai_generated: bool = True
-
-
-def is_ai_available() -> bool:
-    """Check if AI roasting is available (API key configured and valid format)."""
-    if not ANTHROPIC_API_KEY:
-        return False
-    if not validate_api_key_format(ANTHROPIC_API_KEY):
-        logger.warning(f"Invalid ANTHROPIC_API_KEY format detected: {mask_api_key(ANTHROPIC_API_KEY)}")
-        return False
-    logger.info(f"AI roaster ready with model: {AI_MODEL}")
-    return True
-
-
-def build_prompt(
-    dep_count: int,
-    package_names: list[str],
-    cve_list: list[dict],
-    cursed_list: list[dict]
-) -> str:
-    """Build the prompt for Claude to generate a roast."""
-
-    # Format ALL CVEs (not just 5)
-    cve_text = "None detected (suspicious... too clean)"
-    if cve_list:
-        cve_items = [f"- {c['package']}@{c['version']}: {c['cve_id']} ({c['severity']}) - {c['description']}"
-                    for c in cve_list]
-        cve_text = "\n".join(cve_items)
-
-    # Format cursed packages with full context
-    cursed_text = "None found (they're hiding)"
-    if cursed_list:
-        cursed_items = [f"- {c['package']}: {c['description']}" for c in cursed_list]
-        cursed_text = "\n".join(cursed_items)
-
-    # Format full package list (up to 50)
-    pkg_display = package_names[:50]
-    pkg_sample = ", ".join(pkg_display)
-    if len(package_names) > 50:
-        pkg_sample += f" (+{len(package_names) - 50} more lurking)"
-
-    # Template list with better descriptions
-    template_list = "\n".join([f"- {k}: {v}" for k, v in MEME_TEMPLATES.items()])
+# Precomputed lookups for validating/replacing the AI's template pick
+TEMPLATE_IDS = tuple(MEME_TEMPLATES)
+VALID_SEVERITIES = frozenset({"low", "medium", "high", "critical"})
 
-    # Calculate threat level for context
-    threat_level = "DEFCON 5 (calm)"
-    if len(cve_list) > 5 or len(cursed_list) > 2:
-        threat_level = "DEFCON 1 (PANIC)"
-    elif len(cve_list) > 2 or len(cursed_list) > 0:
-        threat_level = "DEFCON 2 (sweating)"
-    elif len(cve_list) > 0 or dep_count > 100:
-        threat_level = "DEFCON 3 (concerned)"
-    elif dep_count > 50:
-        threat_level = "DEFCON 4 (uneasy)"
-
-    prompt = f"""Analyze this dependency disaster and generate a memorable roast.
-
-## THE CRIME SCENE
+# Template list with better descriptions (static - built once at import)
+TEMPLATE_LIST = "\n".join(f"- {k}: {v}" for k, v in MEME_TEMPLATES.items())
 
-**Dependency Count:** {dep_count} packages (each one a potential betrayal)
-**Threat Level:** {threat_level}
-**Packages:** {pkg_sample}
-
-## CVEs DETECTED ({len(cve_list)} total)
-{cve_text}
-
-## CURSED PACKAGES ({len(cursed_list)} found)
-{cursed_text}
-
-## YOUR MISSION
+# Static roast instructions - identical for every request, so they go first and
+# are sent as a cached block (Anthropic prompt caching needs an exact prefix match)
+PROMPT_PREFIX = """## YOUR MISSION
 
 Generate a SHORT meme caption, then pick the template that best matches its vibe.
 
 ## STEP 1: IDENTIFY THE PRIMARY ISSUE
 
-Look at the findings above and identify what stands out MOST:
+Look at the findings (after these instructions) and identify what stands out MOST:
 - Cursed/famous packages? (left-pad, event-stream, colors, moment.js)
 - High CVE count or severity?
 - Absurd micro-dependencies? (is-odd, is-number)
@@ -206,24 +233,24 @@ Look at what you wrote. What's the vibe?
 | Duplicates that shouldn't coexist | highlander |
 
 ## AVAILABLE TEMPLATES
-{template_list}
+""" + TEMPLATE_LIST + """
 
 ## EXAMPLES (notice how template MATCHES the caption's tone)
 
 Example 1 - Snarky cheers vibe:
-{{"roast": "47 CVEs in prod. Cheers to that.", "template": "leonardo", "severity": "high"}}
+{"roast": "47 CVEs in prod. Cheers to that.", "template": "leonardo", "severity": "high"}
 
 Example 2 - Shock vibe:
-{{"roast": "Used left-pad. npm broke. Shocked.", "template": "surprisedpikachu", "severity": "medium"}}
+{"roast": "Used left-pad. npm broke. Shocked.", "template": "surprisedpikachu", "severity": "medium"}
 
 Example 3 - Chaos vibe:
-{{"roast": "11 lines of padding. Mass chaos.", "template": "disaster", "severity": "medium"}}
+{"roast": "11 lines of padding. Mass chaos.", "template": "disaster", "severity": "medium"}
 
 Example 4 - Everywhere vibe:
-{{"roast": "CVEs. CVEs everywhere.", "template": "buzz", "severity": "high"}}
+{"roast": "CVEs. CVEs everywhere.", "template": "buzz", "severity": "high"}
 
 Example 5 - Pain vibe:
-{{"roast": "Still on Flask 1.0. I'm fine.", "template": "harold", "severity": "medium"}}
+{"roast": "Still on Flask 1.0. I'm fine.", "template": "harold", "severity": "medium"}
 
 ## OUTPUT FORMAT
 Return ONLY valid JSON:
@@ -232,9 +259,283 @@ Return ONLY valid JSON:
 - severity: low|medium|high|critical
 - sbom_commentary: 1-2 sentences of sarcastic SBOM analysis (reference specific findings!)
 
-{{"roast": "Top text. Bottom text.", "template": "template_id", "severity": "high", "sbom_commentary": "Your SBOM lists 47 CVEs across 12 packages. That's a 3.9 vulnerability-per-dependency ratio. Impressive efficiency."}}"""
+{"roast": "Top text. Bottom text.", "template": "template_id", "severity": "high", "sbom_commentary": "Your SBOM lists 47 CVEs across 12 packages. That's a 3.9 vulnerability-per-dependency ratio. Impressive efficiency."}"""
+
+# Per-request findings, filled in with a single % pass after the cached prefix
+FINDINGS_TEMPLATE = """Analyze this dependency disaster and generate a memorable roast.
+
+CRIME SCENE: %(dep_count)s deps | THREAT: %(threat_level)s
+PACKAGES: %(pkg_sample)s
+CVEs (%(cve_count)s; format: pkg@ver|cve|sev|desc):
+%(cve_text)s
+CURSED (%(cursed_count)s; format: pkg|desc):
+%(cursed_text)s"""
+
+
+@dataclass
+class AIRoastResult:
+    """Result from AI roast generation."""
+    roast: str
+    template: str
+    severity: str
+    sbom_commentary: str = ""  # AI-generated SBOM analysis
+    ai_generated: bool = True
+
+
+# Canned roasts for tiny, clean inputs - not worth an API round trip
+TRIVIAL_RESPONSES = [
+    AIRoastResult("Clean deps. Too clean. Suspicious.", "fry", "low", ai_generated=False),
+    AIRoastResult("Zero CVEs. Zero cursed packages. What are you hiding?", "aliens", "low", ai_generated=False),
+    AIRoastResult("A tiny dependency list. This is fine.", "fine", "low", ai_generated=False),
+    AIRoastResult("No findings. Cheers to the calm before the storm.", "leonardo", "low", ai_generated=False),
+    AIRoastResult("Nothing to roast. Change my mind.", "changemymind", "low", ai_generated=False),
+]
+
+
+def is_ai_available() -> bool:
+    """Check if AI roasting is available (API key configured and valid format)."""
+    if not ANTHROPIC_API_KEY:
+        return False
+    if not validate_api_key_format(ANTHROPIC_API_KEY):
+        logger.warning("Invalid ANTHROPIC_API_KEY format detected: %s", mask_api_key(ANTHROPIC_API_KEY))
+        return False
+    logger.info("AI roaster ready with model: %s", AI_MODEL)
+    return True
+
+
+def auto_select_level(
+    dep_count: int,
+    cve_count: int,
+    cursed_count: int,
+    level: str = "medium"
+) -> str:
+    """Match model capability to how much there is to roast.
+
+    Trivial inputs (a few deps, nothing found) go to Haiku; loaded
+    findings get upgraded to Opus. Anything in between keeps the
+    requested level.
+    """
+    difficulty = cve_count * 2 + cursed_count * 3 + min(dep_count // 50, 3)
+    if difficulty <= 1:
+        return "low"
+    if difficulty >= 8:
+        return "high"
+    return level
+
+
+@dataclass(frozen=True, slots=True)
+class PromptCVE:
+    """A CVE finding, validated once before prompt building."""
+    package: str
+    version: str
+    cve_id: str
+    severity: str
+    description: str
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PromptCVE":
+        return cls(
+            package=str(data.get("package", "")).strip(),
+            version=str(data.get("version") or "unknown").strip(),
+            cve_id=str(data.get("cve_id", "")).strip(),
+            severity=sys.intern(str(data.get("severity", "unknown")).strip()),
+            description=str(data.get("description", "")).strip(),
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class PromptCursed:
+    """A cursed package finding, validated once before prompt building."""
+    package: str
+    description: str
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PromptCursed":
+        return cls(
+            package=str(data.get("package", "")).strip(),
+            description=str(data.get("description", "")).strip(),
+        )
+
+
+@lru_cache(maxsize=2048)
+def format_cve_line(cve: PromptCVE) -> str:
+    """Render one terse CVE prompt line. Cached - the same famous CVEs show up in most scans."""
+    return f"{cve.package}@{cve.version}|{cve.cve_id}|{cve.severity}|{cve.description[:PROMPT_DESCRIPTION_CHARS]}"
+
+
+def build_prompt(
+    dep_count: int,
+    package_names: list[str],
+    cve_list: list[PromptCVE],
+    cursed_list: list[PromptCursed]
+) -> str:
+    """Build the per-request part of the roast prompt.
+
+    Only the findings are dynamic - the instructions live in PROMPT_PREFIX,
+    which is sent ahead of this text as a separately cached block.
+    """
+
+    # Format CVEs (up to PROMPT_MAX_CVES - counts below still cover all of them)
+    cve_text = "None detected (suspicious... too clean)"
+    if cve_list:
+        cve_items = list(map(format_cve_line, islice(cve_list, PROMPT_MAX_CVES)))
+        if len(cve_list) > PROMPT_MAX_CVES:
+            cve_items.append(f"(+{len(cve_list) - PROMPT_MAX_CVES} more)")
+        cve_text = "\n".join(cve_items)
+
+    # Format cursed packages with full context
+    cursed_text = "None found (they're hiding)"
+    if cursed_list:
+        cursed_items = [
+            f"{c.package}|{c.description[:PROMPT_DESCRIPTION_CHARS]}"
+            for c in islice(cursed_list, PROMPT_MAX_CURSED)
+        ]
+        if len(cursed_list) > PROMPT_MAX_CURSED:
+            cursed_items.append(f"(+{len(cursed_list) - PROMPT_MAX_CURSED} more)")
+        cursed_text = "\n".join(cursed_items)
+
+    # Format package list (up to PROMPT_MAX_PACKAGES)
+    pkg_sample = ", ".join(islice(package_names, PROMPT_MAX_PACKAGES))
+    pkg_total = len(package_names)
+    if pkg_total > PROMPT_MAX_PACKAGES:
+        pkg_sample += f" (+{pkg_total - PROMPT_MAX_PACKAGES} more lurking)"
+
+    # Calculate threat level for context
+    threat_level = "DEFCON 5 (calm)"
+    if len(cve_list) > 5 or len(cursed_list) > 2:
+        threat_level = "DEFCON 1 (PANIC)"
+    elif len(cve_list) > 2 or len(cursed_list) > 0:
+        threat_level = "DEFCON 2 (sweating)"
+    elif len(cve_list) > 0 or dep_count > 100:
+        threat_level = "DEFCON 3 (concerned)"
+    elif dep_count > 50:
+        threat_level = "DEFCON 4 (uneasy)"
+
+    return FINDINGS_TEMPLATE % {
+        "dep_count": dep_count,
+        "threat_level": threat_level,
+        "pkg_sample": pkg_sample,
+        "cve_count": len(cve_list),
+        "cve_text": cve_text,
+        "cursed_count": len(cursed_list),
+        "cursed_text": cursed_text,
+    }
+
+
+def roast_key(model: str, prompt: str) -> str:
+    """Fingerprint a roast request (model + prompt) for deduplication."""
+    return hashlib.sha256(f"{model}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+def extract_json_object(content: str) -> str:
+    """Slice the outermost {...} out of model output.
+
+    Drops markdown code fences and any chatter around the JSON using two
+    index scans - no splitting or regex backtracking on long responses.
+    """
+    start = content.find("{")
+    end = content.rfind("}")
+    if start < 0 or end < start:
+        return content
+    return content[start:end + 1]
+
+
+def findings_key(model: str, dep_count: int, cve_list: list[dict], cursed_list: list[dict]) -> str:
+    """Fingerprint the findings that drive a roast, for the result cache.
+
+    Order-insensitive, and ignores descriptions - the same CVEs and cursed
+    packages in a re-submitted file should hit the cache.
+    """
+    canonical = orjson.dumps({
+        "model": model,
+        "n": dep_count,
+        "cves": sorted((str(c.get("package", "")), str(c.get("cve_id", ""))) for c in cve_list),
+        "cursed": sorted(str(c.get("package", "")) for c in cursed_list),
+    })
+    return hashlib.blake2b(canonical, digest_size=16).hexdigest()
+
+
+def get_cached_roast(key: str) -> Optional["AIRoastResult"]:
+    """Return a cached roast if present and not expired (refreshes LRU order)."""
+    entry = _roast_cache.get(key)
+    if entry is None:
+        return None
+    stored_at, result = entry
+    if time.monotonic() - stored_at > ROAST_CACHE_TTL:
+        del _roast_cache[key]
+        return None
+    _roast_cache.move_to_end(key)
+    return result
+
+
+def cache_roast(key: str, result: "AIRoastResult") -> None:
+    """Store a roast, evicting the least recently used beyond the size cap."""
+    _roast_cache[key] = (time.monotonic(), result)
+    _roast_cache.move_to_end(key)
+    while len(_roast_cache) > ROAST_CACHE_MAX_SIZE:
+        _roast_cache.popitem(last=False)
+
+
+class JSONObjectScanner:
+    """Incrementally track brace depth to spot when a JSON object is complete.
+
+    Braces inside string literals are ignored, so roasts like "{count} CVEs"
+    don't confuse the counter.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+        self.end = 0  # Offset just past the closing brace in the last chunk fed
+
+    def feed(self, text: str) -> bool:
+        """Consume a chunk of text. Returns True once the outermost object closes."""
+        for i, ch in enumerate(text):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                if self.started:
+                    self.in_string = True
+            elif ch == "{":
+                self.depth += 1
+                self.started = True
+            elif ch == "}" and self.started:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.end = i + 1
+                    return True
+        return False
+
+
+async def read_streamed_json(response: httpx.Response) -> str:
+    """Collect text deltas from an Anthropic SSE stream.
 
-    return prompt
+    Stops reading as soon as the first JSON object in the text is balanced -
+    anything the model writes after the closing brace is never downloaded.
+    """
+    buffer = []
+    scanner = JSONObjectScanner()
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        event = orjson.loads(line[5:])
+        event_type = event.get("type")
+        if event_type == "content_block_delta":
+            text = event.get("delta", {}).get("text", "")
+            if scanner.feed(text):
+                buffer.append(text[:scanner.end])
+                break
+            buffer.append(text)
+        elif event_type in ("message_stop", "error"):
+            break
+    return "".join(buffer)
 
 
 async def generate_ai_roast(
@@ -242,7 +543,8 @@ async def generate_ai_roast(
     package_names: list[str],
     cve_list: list[dict],
     cursed_list: list[dict],
-    level: str = "medium"
+    level: str = "medium",
+    no_cache: bool = False
 ) -> Optional[AIRoastResult]:
     """Generate a roast using Claude API.
     
@@ -252,117 +554,287 @@ async def generate_ai_roast(
         cve_list: List of CVE dicts with package, version, cve_id, severity, description
         cursed_list: List of cursed package dicts with package, description
         level: Reasoning level - "low" (Haiku), "medium" (Sonnet), "high" (Opus)
+        no_cache: Skip the local result cache and always call the API
     
     Returns:
-        AIRoastResult if successful, None if failed
+        AIRoastResult if successful, None if failed. Trivial inputs get a
+        canned result with ai_generated=False.
     """
     if not is_ai_available():
         return None
+
+    # DEFCON 5 fast path - a handful of clean deps gets a canned roast, no API call
+    if not cve_list and not cursed_list and dep_count < 10:
+        logger.info("Trivial input (%s deps, no findings), skipping AI API", dep_count)
+        return random.choice(TRIVIAL_RESPONSES)
     
+    # Route by input difficulty - cheap model for trivial input, best for disasters
+    selected_level = auto_select_level(dep_count, len(cve_list), len(cursed_list), level)
+    if selected_level != level:
+        logger.info("Auto-selected AI level: %s -> %s", level, selected_level)
+        level = selected_level
+
     # Select model based on level
     model = AI_MODELS.get(level, AI_MODELS["medium"])
-    logger.info(f"Using AI model: {model} (level={level})")
-    
-    prompt = build_prompt(dep_count, package_names, cve_list, cursed_list)
+    max_tokens = AI_MAX_TOKENS.get(level, 512)
+    logger.info("Using AI model: %s (level=%s)", model, level)
+
+    # Same findings seen recently - serve the cached roast, no network round trip
+    cache_key = findings_key(model, dep_count, cve_list, cursed_list)
+    if not no_cache:
+        cached = get_cached_roast(cache_key)
+        if cached is not None:
+            logger.info("AI roast cache hit")
+            return cached
     
+    prompt = build_prompt(
+        dep_count,
+        package_names,
+        [PromptCVE.from_dict(c) for c in cve_list],
+        [PromptCursed.from_dict(c) for c in cursed_list]
+    )
+
+    # Single-flight: identical concurrent requests share one API call
+    key = roast_key(model, prompt)
+    loop = asyncio.get_running_loop()
+    inflight = _inflight_roasts.get(key)
+    if inflight is not None and inflight.get_loop() is loop:
+        logger.info("Joining in-flight AI roast request")
+        return await asyncio.shield(inflight)
+
+    future = loop.create_future()
+    _inflight_roasts[key] = future
+    try:
+        result = await _request_roast(model, max_tokens, prompt)
+        future.set_result(result)
+        if result is not None:
+            cache_roast(cache_key, result)
+        return result
+    finally:
+        if not future.done():
+            future.set_result(None)  # Cancelled - waiters fall back to captions
+        if _inflight_roasts.get(key) is future:
+            del _inflight_roasts[key]
+
+
+@lru_cache(maxsize=8)
+def _request_envelope(model: str, max_tokens: int) -> tuple[bytes, bytes]:
+    """Pre-encode the static request JSON around the findings slot.
+
+    The system prompt and instructions are the bulk of the body and never
+    change, so they are serialized once per model/max_tokens pair rather
+    than on every call.
+    """
+    body = orjson.dumps({
+        "model": model,
+        "max_tokens": max_tokens,
+        "temperature": 0.7,  # Balance: consistent matching but varied creativity
+        "stream": True,  # Stop reading as soon as the JSON object closes
+        "system": [
+            {"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}
+        ],
+        "messages": [
+            {"role": "user", "content": [
+                # Cache breakpoint covers system + static instructions
+                {"type": "text", "text": PROMPT_PREFIX, "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": None}
+            ]}
+        ]
+    })
+    head, tail = body.rsplit(b"null", 1)  # Findings text is the last field, so its null is the final one
+    return head, tail
+
+
+def build_request_body(model: str, max_tokens: int, prompt: str) -> bytes:
+    """Build the Messages API request body, encoding only the findings prompt per call."""
+    head, tail = _request_envelope(model, max_tokens)
+    return head + orjson.dumps(prompt) + tail
+
+
+def retry_delay(attempt: int, retry_after: str | None = None) -> float:
+    """Seconds to wait before retry number `attempt` (0-based).
+
+    Honors a numeric Retry-After header, otherwise exponential backoff with jitter.
+    """
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass  # HTTP-date form - fall back to our own backoff
+    return AI_RETRY_BASE_DELAY * 2 ** attempt + random.uniform(-AI_RETRY_JITTER, AI_RETRY_JITTER)
+
+
+async def _stream_roast_content(model: str, max_tokens: int, prompt: str) -> Optional[str]:
+    """POST the roast request, retrying transient failures, and return the streamed JSON text."""
+    client = get_client()
+    slots = get_api_slots()
+    body = build_request_body(model, max_tokens, prompt)
+    deadline = time.monotonic() + AI_TIMEOUT
+
+    for attempt in range(AI_MAX_RETRIES + 1):
+        last_attempt = attempt == AI_MAX_RETRIES
+        retry_after = None
+        # Each attempt gets its own timeout out of what's left of the AI_TIMEOUT budget
+        timeout = httpx.Timeout(min(AI_ATTEMPT_TIMEOUT, deadline - time.monotonic()))
+        try:
+            # Slot is held per attempt, not across backoff sleeps
+            async with slots, client.stream("POST", ANTHROPIC_API_URL, content=body, timeout=timeout) as response:
+                if response.status_code == 200:
+                    return await read_streamed_json(response)
+
+                if last_attempt or response.status_code not in RETRYABLE_STATUS_CODES:
+                    # M-4 Security: Log error without exposing full response (may contain key info)
+                    error_body = await response.aread()
+                    error_json = orjson.loads(error_body) if response.headers.get("content-type", "").startswith("application/json") else {}
+                    error_msg = error_json.get("error", {}).get("message", "unknown")
+                    logger.warning("AI API error: status=%s, model=%s, error=%s", response.status_code, AI_MODEL, error_msg)
+                    return None
+                retry_after = response.headers.get("retry-after")
+        except httpx.TimeoutException:
+            if last_attempt:
+                raise
+
+        # Only retry if the backoff still fits in the overall AI_TIMEOUT budget
+        delay = retry_delay(attempt, retry_after)
+        if time.monotonic() + delay >= deadline:
+            logger.warning("AI API retry budget exhausted after %s attempts", attempt + 1)
+            return None
+        await asyncio.sleep(delay)
+
+    return None
+
+
+async def _request_roast(model: str, max_tokens: int, prompt: str) -> Optional[AIRoastResult]:
+    """Call the Claude API with a built prompt and parse the roast JSON."""
     try:
-        async with httpx.AsyncClient(timeout=AI_TIMEOUT) as client:
-            response = await client.post(
-                ANTHROPIC_API_URL,
-                headers={
-                    "x-api-key": ANTHROPIC_API_KEY,
-                    "anthropic-version": "2023-06-01",
-                    "content-type": "application/json"
-                },
-                json={
-                    "model": model,
-                    "max_tokens": 512,
-                    "temperature": 0.7,  # Balance: consistent matching but varied creativity
-                    "system": SYSTEM_PROMPT,
-                    "messages": [
-                        {"role": "user", "content": prompt}
-                    ]
-                }
-            )
-            
-            if response.status_code != 200:
-                # M-4 Security: Log error without exposing full response (may contain key info)
-                error_body = response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
-                error_msg = error_body.get("error", {}).get("message", "unknown")
-                logger.warning(f"AI API error: status={response.status_code}, model={AI_MODEL}, error={error_msg}")
-                return None
-            
-            data = response.json()
-            content = data.get("content", [{}])[0].get("text", "")
-            
-            # Parse JSON response
-            # Handle potential markdown code blocks
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0]
-            elif "```" in content:
-                content = content.split("```")[1].split("```")[0]
-            
-            result = json.loads(content.strip())
-            
-            # Validate template - random fallback if invalid
-            template = result.get("template", "")
-            if template not in MEME_TEMPLATES:
-                import random
-                old_template = template
-                template = random.choice(list(MEME_TEMPLATES.keys()))
-                logger.warning(f"AI returned invalid template '{old_template}', using random: {template}")
-            
-            # Get roast and enforce length limit
-            roast = result.get("roast", "Your dependencies are concerning.")
-            if len(roast) > 120:
-                # AI ignored length limit - truncate intelligently
-                logger.warning(f"AI roast too long ({len(roast)} chars), truncating")
-                # Try to cut at a sentence boundary
-                if ". " in roast[:100]:
-                    parts = roast[:100].rsplit(". ", 1)
-                    roast = parts[0] + "."
-                else:
-                    roast = roast[:100] + "..."
-            
-            # Get SBOM commentary if provided, with length limit
-            sbom_commentary = result.get("sbom_commentary", "")
-            if sbom_commentary and len(sbom_commentary) > 200:
-                logger.warning(f"AI sbom_commentary too long ({len(sbom_commentary)} chars), truncating")
-                # Truncate at sentence boundary if possible
-                if ". " in sbom_commentary[:180]:
-                    sbom_commentary = sbom_commentary[:180].rsplit(". ", 1)[0] + "."
-                else:
-                    sbom_commentary = sbom_commentary[:180] + "..."
-            
-            return AIRoastResult(
-                roast=roast,
-                template=template,
-                severity=result.get("severity", "medium"),
-                sbom_commentary=sbom_commentary,
-                ai_generated=True
-            )
-            
-    except json.JSONDecodeError as e:
-        logger.warning(f"AI response parse error: {e}")
+        content = await _stream_roast_content(model, max_tokens, prompt)
+        if content is None:
+            return None
+        
+        # Parse JSON response (may be wrapped in markdown code blocks)
+        result = orjson.loads(extract_json_object(content))
+        
+        # Validate template - random fallback if invalid (common path is a single lookup)
+        try:
+            template = result["template"]
+            MEME_TEMPLATES[template]
+        except (KeyError, TypeError):
+            old_template = result.get("template", "")
+            template = random.choice(TEMPLATE_IDS)
+            logger.warning("AI returned invalid template '%s', using random: %s", old_template, template)
+
+        # Validate severity - default to medium if missing or made up
+        severity = result.get("severity")
+        if not isinstance(severity, str) or severity not in VALID_SEVERITIES:
+            severity = "medium"
+        
+        # Get roast and enforce length limit
+        roast = result.get("roast", "Your dependencies are concerning.")
+        if len(roast) > 120:
+            # AI ignored length limit - truncate intelligently
+            logger.warning("AI roast too long (%s chars), truncating", len(roast))
+            # Try to cut at a sentence boundary
+            if ". " in roast[:100]:
+                parts = roast[:100].rsplit(". ", 1)
+                roast = parts[0] + "."
+            else:
+                roast = roast[:100] + "..."
+        
+        # Get SBOM commentary if provided, with length limit
+        sbom_commentary = result.get("sbom_commentary", "")
+        if sbom_commentary and len(sbom_commentary) > 200:
+            logger.warning("AI sbom_commentary too long (%s chars), truncating", len(sbom_commentary))
+            # Truncate at sentence boundary if possible
+            if ". " in sbom_commentary[:180]:
+                sbom_commentary = sbom_commentary[:180].rsplit(". ", 1)[0] + "."
+            else:
+                sbom_commentary = sbom_commentary[:180] + "..."
+        
+        return AIRoastResult(
+            roast=roast,
+            template=template,
+            severity=severity,
+            sbom_commentary=sbom_commentary,
+            ai_generated=True
+        )
+        
+    except orjson.JSONDecodeError as e:
+        logger.warning("AI response parse error: %s", e)
         return None
     except httpx.TimeoutException:
         logger.warning("AI API timeout")
         return None
     except Exception as e:
-        logger.warning(f"AI API error: {type(e).__name__}")
+        logger.warning("AI API error: %s", type(e).__name__)
         return None
 
 
+async def generate_ai_roasts(batch: list[tuple]) -> list[Optional[AIRoastResult]]:
+    """Generate roasts for several inputs concurrently.
+
+    Args:
+        batch: List of argument tuples for generate_ai_roast
+            (dep_count, package_names, cve_list, cursed_list[, level])
+
+    Returns:
+        Results in the same order as batch (None for any that failed)
+    """
+    # API concurrency is bounded inside _stream_roast_content (get_api_slots)
+    results = await asyncio.gather(
+        *(generate_ai_roast(*args) for args in batch),
+        return_exceptions=True
+    )
+    # One failed roast (e.g. a bad finding while building its prompt) must not sink the batch
+    roasts = []
+    for result in results:
+        if isinstance(result, Exception):
+            logger.warning("AI batch roast error: %s", type(result).__name__)
+            result = None
+        roasts.append(result)
+    return roasts
+
+
+# Background event loop for sync callers - created on first use
+_background_loop: Optional[asyncio.AbstractEventLoop] = None
+_background_loop_lock = threading.Lock()
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    """Get (or start) the daemon thread running the shared event loop."""
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None:
+            _background_loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_background_loop.run_forever,
+                name="ai-roaster-loop",
+                daemon=True
+            ).start()
+        return _background_loop
+
+
 def generate_ai_roast_sync(
     dep_count: int,
     package_names: list[str],
     cve_list: list[dict],
     cursed_list: list[dict]
 ) -> Optional[AIRoastResult]:
-    """Synchronous wrapper for generate_ai_roast (for non-async contexts)."""
-    import asyncio
+    """Synchronous wrapper for generate_ai_roast (for non-async contexts).
+
+    Runs on a shared background event loop instead of spinning up a fresh
+    one per call with asyncio.run.
+    """
+    future = asyncio.run_coroutine_threadsafe(
+        generate_ai_roast(dep_count, package_names, cve_list, cursed_list),
+        _get_background_loop()
+    )
     try:
-        return asyncio.run(generate_ai_roast(dep_count, package_names, cve_list, cursed_list))
+        return future.result(timeout=AI_SYNC_TIMEOUT)
+    except concurrent.futures.TimeoutError:
+        # Stop the coroutine too, or it keeps its API slot and single-flight entry
+        future.cancel()
+        logger.warning("AI sync wrapper timed out")
+        return None
     except Exception as e:
-        logger.warning(f"AI sync wrapper error: {type(e).__name__}")
+        logger.warning("AI sync wrapper error: %s", type(e).__name__)
         return None
@@ -1,19 +1,35 @@
 # PURPOSE: Dependency file parsing and analysis for PARANOID
 # Parses package.json, requirements.txt, extracts dependencies
 
-import json
 import re
+import orjson
 from dataclasses import dataclass
 
+# Requirement lines across a whole file in one scan: package==version, package>=version,
+# bare names and dotted names (zope.interface, ruamel.yaml). Extras like [dev] and
+# trailing comments are dropped; comment lines and -r/-e/--index-url directives never match.
+REQ_LINE_PATTERN = re.compile(
+    r'^[ \t]*(?![-#])([a-zA-Z0-9_.-]+)(?:\[[^\]\n]*\])?([<>=!~][^#\n]*)?[ \t\r]*(?:#.*)?$',
+    re.MULTILINE
+)
 
-@dataclass
+# detect_input_type probes: a version operator anywhere (==, >=, <=, ~=, != or a bare >),
+# or a bare (optionally extras) name
+REQ_OP_PATTERN = re.compile(r'[=<~!]=|>')
+BARE_PKG_PATTERN = re.compile(r'^[a-zA-Z][a-zA-Z0-9_-]*(\[.*\])?$')
+SINGLE_PKG_PATTERN = re.compile(r'^@?[a-zA-Z][a-zA-Z0-9_/-]*(@[\d.]+)?$')
+# package.json sections that list dependencies, in reporting order
+DEP_TYPES = ("dependencies", "devDependencies", "peerDependencies", "optionalDependencies")
+
+
+@dataclass(slots=True, frozen=True)
 class Dependency:
     name: str
     version: str | None = None
     source: str = "unknown"  # dependencies, devDependencies, etc.
 
 
-@dataclass
+@dataclass(slots=True)
 class AnalysisResult:
     dependencies: list[Dependency]
     dep_count: int
@@ -22,31 +38,35 @@ class AnalysisResult:
     errors: list[str]
 
 
-def parse_package_json(content: str) -> AnalysisResult:
-    """Parse npm package.json and extract dependencies."""
+def parse_package_json(content: str, data: dict | None = None) -> AnalysisResult:
+    """Parse npm package.json and extract dependencies.
+
+    Pass ``data`` when the document was already decoded (e.g. during input
+    type detection) to skip parsing it a second time.
+    """
     deps = []
     errors = []
 
-    try:
-        data = json.loads(content)
-    except json.JSONDecodeError as e:
-        return AnalysisResult(
-            dependencies=[],
-            dep_count=0,
-            input_type="package_json",
-            raw_content=content,
-            errors=[f"Invalid JSON: {str(e)}"]
-        )
+    if data is None:
+        try:
+            data = orjson.loads(content)
+        except orjson.JSONDecodeError as e:
+            return AnalysisResult(
+                dependencies=[],
+                dep_count=0,
+                input_type="package_json",
+                raw_content=content,
+                errors=[f"Invalid JSON: {str(e)}"]
+            )
 
     # Extract dependencies
-    for dep_type in ["dependencies", "devDependencies", "peerDependencies", "optionalDependencies"]:
-        if dep_type in data and isinstance(data[dep_type], dict):
-            for name, version in data[dep_type].items():
-                deps.append(Dependency(
-                    name=name,
-                    version=str(version) if version else None,
-                    source=dep_type
-                ))
+    for dep_type in DEP_TYPES:
+        section = data.get(dep_type) if isinstance(data, dict) else None
+        if isinstance(section, dict):
+            deps.extend(
+                Dependency(name, str(version) if version else None, dep_type)
+                for name, version in section.items()
+            )
 
     return AnalysisResult(
         dependencies=deps,
@@ -59,41 +79,21 @@ def parse_package_json(content: str) -> AnalysisResult:
 
 def parse_requirements_txt(content: str) -> AnalysisResult:
     """Parse Python requirements.txt and extract dependencies."""
-    deps = []
-    errors = []
-
-    # Regex for requirement lines: package==version, package>=version, etc.
-    # Also handles bare package names and dotted names (zope.interface, ruamel.yaml)
-    req_pattern = re.compile(r'^([a-zA-Z0-9_.-]+)([<>=!~]+.*)?$')
-
-    for line in content.split('\n'):
-        line = line.strip()
-
-        # Skip empty lines and comments
-        if not line or line.startswith('#'):
-            continue
-
-        # Skip -r, -e, --index-url, etc.
-        if line.startswith('-'):
-            continue
-
-        # Try to parse the requirement
-        match = req_pattern.match(line.split('[')[0].strip())  # Remove extras like [dev]
-        if match:
-            name = match.group(1)
-            version = match.group(2)
-            deps.append(Dependency(
-                name=name,
-                version=version.strip() if version else None,
-                source="requirements"
-            ))
+    deps = [
+        Dependency(
+            name=match.group(1),
+            version=(match.group(2) or "").strip() or None,
+            source="requirements"
+        )
+        for match in REQ_LINE_PATTERN.finditer(content)
+    ]
 
     return AnalysisResult(
         dependencies=deps,
         dep_count=len(deps),
         input_type="requirements_txt",
         raw_content=content,
-        errors=errors
+        errors=[]
     )
 
 
@@ -178,48 +178,55 @@ def parse_single_package(content: str) -> AnalysisResult:
 
 def detect_input_type(content: str) -> str:
     """Auto-detect input type based on content patterns."""
+    return _detect_input_type(content)[0]
+
+
+def _detect_input_type(content: str) -> tuple[str, dict | None]:
+    """Detect the input type, also returning the decoded package.json if any.
+
+    The decoded dict lets analyze() hand package.json input straight to the
+    parser, so the document is only parsed once.
+    """
     content_stripped = content.strip()
     
     # Check for package.json (JSON with dependencies or devDependencies)
     if content_stripped.startswith("{"):
         try:
-            data = json.loads(content_stripped)
-            if isinstance(data, dict):
-                if "dependencies" in data or "devDependencies" in data:
-                    return "package_json"
-                if "name" in data and "version" in data:
-                    return "package_json"  # Likely a package.json
-        except json.JSONDecodeError:
-            pass
+            data = orjson.loads(content_stripped)
+        except orjson.JSONDecodeError:
+            data = None
+        if isinstance(data, dict):
+            if "dependencies" in data or "devDependencies" in data:
+                return "package_json", data
+            if "name" in data and "version" in data:
+                return "package_json", data  # Likely a package.json
     
     # Check for requirements.txt patterns
     # Lines like: package==1.0.0, package>=1.0, package[extra], etc.
-    lines = content_stripped.split('\n')
+    lines = content_stripped.split('\n', 10)
     requirements_patterns = 0
     for line in lines[:10]:  # Check first 10 lines
         line = line.strip()
         if not line or line.startswith('#'):
             continue
         # requirements.txt patterns: ==, >=, <=, ~=, !=, or just package name
-        if any(op in line for op in ['==', '>=', '<=', '~=', '!=', '>']):
-            requirements_patterns += 1
-        elif re.match(r'^[a-zA-Z][a-zA-Z0-9_-]*(\[.*\])?$', line):
+        if REQ_OP_PATTERN.search(line) or BARE_PKG_PATTERN.match(line):
             requirements_patterns += 1
     
     if requirements_patterns >= 2:
-        return "requirements_txt"
+        return "requirements_txt", None
     
     # Check for go.mod
     if "module " in content_stripped and "go " in content_stripped:
-        return "go_mod"
+        return "go_mod", None
     
     # Check for single package (simple format: name or name@version)
     if '\n' not in content_stripped and len(content_stripped) < 100:
-        if re.match(r'^@?[a-zA-Z][a-zA-Z0-9_/-]*(@[\d.]+)?$', content_stripped):
-            return "single_package"
+        if SINGLE_PKG_PATTERN.match(content_stripped):
+            return "single_package", None
     
     # Default fallback
-    return "unknown"
+    return "unknown", None
 
 
 def analyze(input_type: str, content: str, auto_detect: bool = True) -> AnalysisResult:
@@ -238,8 +245,9 @@ def analyze(input_type: str, content: str, auto_detect: bool = True) -> Analysis
     }
 
     # Auto-detect input type if enabled
+    package_data = None
     if auto_detect:
-        detected = detect_input_type(content)
+        detected, package_data = _detect_input_type(content)
         if detected != "unknown" and detected != input_type:
             # Content clearly matches a different type - use detected type
             input_type = detected
@@ -254,4 +262,6 @@ def analyze(input_type: str, content: str, auto_detect: bool = True) -> Analysis
             errors=[f"Unsupported input type: {input_type}. Try package_json, requirements_txt, or single_package."]
         )
 
+    if input_type == "package_json" and package_data is not None:
+        return parse_package_json(content, package_data)
     return parser(content)
@@ -1,9 +1,16 @@
 # PURPOSE: Caption selection for PARANOID roasts
 # Selects appropriate caption from library based on findings
 
-import json
+import datetime
 import random
+import re
+import time
+from bisect import bisect_left
+from functools import lru_cache
 from pathlib import Path
+from types import MappingProxyType
+
+import orjson
 
 # MELTDOWN MODE: Unhinged captions when paranoia hits maximum
 MELTDOWN_CAPTIONS = [
@@ -52,125 +59,174 @@ PANIC_MELTDOWN_SECRETS = [
     "DECLASSIFIED: The only winning move is 'rm -rf node_modules'. But you won't.",
 ]
 
+# Dependency count buckets: each threshold is the inclusive upper bound of its bucket
+DEP_COUNT_THRESHOLDS = (10, 50, 100, 500)
+DEP_COUNT_BUCKETS = ("0-10", "11-50", "51-100", "101-500", "500+")
+
+FALLBACK_CAPTION = "Your dependencies are a disaster. This is fine."
+# Placeholders select_caption fills in - one regex pass instead of a replace per key
+PLACEHOLDER_PATTERN = re.compile(r"\{(count|year|count_times_3)\}")
+
 # Load captions at module init
 CAPTIONS_PATH = Path(__file__).parent.parent / "data" / "captions.json"
-CAPTIONS = {}
+CAPTIONS = MappingProxyType({})
+# Finding type -> captions.json section it draws from
+CAPTION_SECTIONS = {
+    "dependency_count": "dependency_count",
+    "cve": "cve",
+    "outdated": "outdated",
+    "sbom": "sbom",
+    "paranoia": "paranoia",
+    "error": "error_messages",
+}
+# (finding type, bucket/severity/sub-type) -> caption list, rebuilt on load
+_CAPTION_INDEX: dict[tuple[str, str], list[str]] = {}
+# Cursed package name (plus underscore alias) -> caption list, rebuilt on load
+_CURSED_INDEX: dict[str, list] = {}
+# Captions that contain a placeholder - everything else skips substitution entirely
+_TEMPLATED_CAPTIONS: frozenset[str] = frozenset()
 
 def load_captions():
-    """Load caption library from JSON."""
-    global CAPTIONS
+    """Load caption library from JSON (read-only once loaded)."""
+    global CAPTIONS, _CAPTION_INDEX, _CURSED_INDEX, _TEMPLATED_CAPTIONS
     try:
-        with open(CAPTIONS_PATH) as f:
-            CAPTIONS = json.load(f)
+        with open(CAPTIONS_PATH, "rb") as f:
+            CAPTIONS = MappingProxyType(orjson.loads(f.read()))
     except Exception as e:
         print(f"Warning: Could not load captions: {e}")
-        CAPTIONS = {}
+        CAPTIONS = MappingProxyType({})
+
+    _CAPTION_INDEX = {
+        (finding_type, sub_key): captions
+        for finding_type, section in CAPTION_SECTIONS.items()
+        for sub_key, captions in CAPTIONS.get(section, {}).items()
+    }
+
+    _CURSED_INDEX = {}
+    for name, captions in CAPTIONS.get("cursed_packages", {}).items():
+        if captions:
+            _CURSED_INDEX.setdefault(name.lower(), captions)
+            _CURSED_INDEX.setdefault(name.lower().replace("-", "_"), captions)
+    cursed_captions.cache_clear()
+
+    _TEMPLATED_CAPTIONS = frozenset(
+        caption
+        for section in CAPTIONS.values() if isinstance(section, dict)
+        for captions in section.values() if isinstance(captions, list)
+        for caption in captions
+        if isinstance(caption, str) and PLACEHOLDER_PATTERN.search(caption)
+    )
+
+@lru_cache(maxsize=4096)
+def cursed_captions(pkg_lower: str) -> list[str]:
+    """Captions for a lowercased package name (cached - the substring scan runs once per name)."""
+    # Exact name first, then a name embedded in a scoped/forked one (e.g. "@scope/left-pad-fork")
+    captions = _CURSED_INDEX.get(pkg_lower)
+    if captions is None:
+        for cursed_name, candidates in _CURSED_INDEX.items():
+            if cursed_name in pkg_lower:
+                return candidates
+    return captions or []
+
 
 load_captions()
 
 
 def get_dep_count_bucket(count: int) -> str:
     """Map dependency count to caption bucket."""
-    if count <= 10:
-        return "0-10"
-    elif count <= 50:
-        return "11-50"
-    elif count <= 100:
-        return "51-100"
-    elif count <= 500:
-        return "101-500"
-    else:
-        return "500+"
+    return DEP_COUNT_BUCKETS[bisect_left(DEP_COUNT_THRESHOLDS, count)]
 
 
-def select_caption(
+# "Last year" for {year} substitution, recomputed at most once a minute
+_YEAR_TTL_SECONDS = 60
+_year_cache = (0.0, "")
+
+
+def _last_year() -> str:
+    """Return last calendar year as a string, cached for _YEAR_TTL_SECONDS."""
+    global _year_cache
+    now = time.monotonic()
+    expires, year = _year_cache
+    if now >= expires:
+        year = str(datetime.datetime.now().year - 1)
+        _year_cache = (now + _YEAR_TTL_SECONDS, year)
+    return year
+
+
+def caption_pool(
     finding_type: str,
     dep_count: int = 0,
     severity: str = None,
     package_name: str = None,
     **kwargs
-) -> str:
-    """Select appropriate caption based on finding type and context.
-
-    Args:
-        finding_type: Type of finding (dependency_count, cve, cursed, outdated, sbom, paranoia)
-        dep_count: Number of dependencies (for substitution)
-        severity: CVE severity or paranoia level
-        package_name: Specific package name for cursed package roasts
-
-    Returns:
-        Selected caption string with substitutions applied
-    """
-    caption = None
+) -> list[str]:
+    """Return the caption list a finding draws from (empty if none match)."""
+    if finding_type == "cursed":
+        # Check for specific cursed package
+        if not package_name:
+            return []
+        return cursed_captions(package_name.lower())
 
     if finding_type == "dependency_count":
-        bucket = get_dep_count_bucket(dep_count)
-        captions = CAPTIONS.get("dependency_count", {}).get(bucket, [])
-        if captions:
-            caption = random.choice(captions)
-
+        sub_key = get_dep_count_bucket(dep_count)
     elif finding_type == "cve":
-        severity_key = (severity or "medium").lower()
-        captions = CAPTIONS.get("cve", {}).get(severity_key, [])
-        if captions:
-            caption = random.choice(captions)
-
-    elif finding_type == "cursed":
-        # Check for specific cursed package
-        if package_name:
-            pkg_lower = package_name.lower()
-            for cursed_name in ["left-pad", "event-stream", "colors", "faker", "ua-parser-js"]:
-                if cursed_name in pkg_lower or pkg_lower in cursed_name:
-                    captions = CAPTIONS.get("cursed_packages", {}).get(cursed_name.replace("-", "_").replace("ua-parser-js", "ua-parser-js"), [])
-                    if not captions:
-                        # Try with hyphen
-                        captions = CAPTIONS.get("cursed_packages", {}).get(cursed_name, [])
-                    if captions:
-                        caption = random.choice(captions)
-                    break
-
+        sub_key = (severity or "medium").lower()
     elif finding_type == "outdated":
         # Map to 1_year, 2_years, 5_years based on context
         years = kwargs.get("years_old", 1)
         if years >= 5:
-            key = "5_years"
+            sub_key = "5_years"
         elif years >= 2:
-            key = "2_years"
+            sub_key = "2_years"
         else:
-            key = "1_year"
-        captions = CAPTIONS.get("outdated", {}).get(key, [])
-        if captions:
-            caption = random.choice(captions)
-
+            sub_key = "1_year"
     elif finding_type == "sbom":
-        sub_type = kwargs.get("sub_type", "commentary")
-        captions = CAPTIONS.get("sbom", {}).get(sub_type, [])
-        if captions:
-            caption = random.choice(captions)
-
+        sub_key = kwargs.get("sub_type", "commentary")
     elif finding_type == "paranoia":
-        level = (severity or "chill").lower()
-        captions = CAPTIONS.get("paranoia", {}).get(level, [])
-        if captions:
-            caption = random.choice(captions)
-
+        sub_key = (severity or "chill").lower()
     elif finding_type == "error":
-        error_code = str(kwargs.get("error_code", 500))
-        captions = CAPTIONS.get("error_messages", {}).get(error_code, [])
-        if captions:
-            caption = random.choice(captions)
+        sub_key = str(kwargs.get("error_code", 500))
+    else:
+        return []
+
+    return _CAPTION_INDEX.get((finding_type, sub_key), [])
+
 
-    # Fallback
-    if not caption:
-        caption = "Your dependencies are a disaster. This is fine."
+def apply_substitutions(caption: str, dep_count: int = 0) -> str:
+    """Fill {count}, {year} and {count_times_3} in a single pass."""
+    if "{" not in caption:
+        return caption
+    values = {
+        "count": str(dep_count),
+        "year": _last_year(),
+        "count_times_3": str(dep_count * 3),
+    }
+    return PLACEHOLDER_PATTERN.sub(lambda m: values[m.group(1)], caption)
+
+
+def select_caption(
+    finding_type: str,
+    dep_count: int = 0,
+    severity: str = None,
+    package_name: str = None,
+    **kwargs
+) -> str:
+    """Select appropriate caption based on finding type and context.
 
-    # Apply substitutions
-    import datetime
-    caption = caption.replace("{count}", str(dep_count))
-    caption = caption.replace("{year}", str(datetime.datetime.now().year - 1))
-    caption = caption.replace("{count_times_3}", str(dep_count * 3))
+    Args:
+        finding_type: Type of finding (dependency_count, cve, cursed, outdated, sbom, paranoia)
+        dep_count: Number of dependencies (for substitution)
+        severity: CVE severity or paranoia level
+        package_name: Specific package name for cursed package roasts
 
-    return caption
+    Returns:
+        Selected caption string with substitutions applied
+    """
+    captions = caption_pool(finding_type, dep_count, severity, package_name, **kwargs)
+    caption = random.choice(captions) if captions else FALLBACK_CAPTION
+    if caption not in _TEMPLATED_CAPTIONS:
+        return caption
+    return apply_substitutions(caption, dep_count)
 
 
 def get_sbom_commentary() -> str:
@@ -1,32 +1,52 @@
 # PURPOSE: Cursed package detection for PARANOID
 # Detects infamous packages and typosquats
 
-import json
 import random
+import orjson
 from pathlib import Path
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from operator import attrgetter
 from typing import Optional
 
+# Cursed severity rank (higher = worse)
+CURSED_SEVERITY_ORDER = {
+    "medium": 1,
+    "high": 2,
+    "critical": 3,
+    "legendary": 4  # Reserved for left-pad
+}
+
 # Load cursed packages database
 CURSED_DB_PATH = Path(__file__).parent.parent / "data" / "cursed.json"
 CURSED_DB: dict = {}
+# Lowercase name -> (is_typosquat, package data or intended package name).
+# Cursed packages and typosquats share one table so a scan is one lookup per name.
+CURSED_INDEX: dict[str, tuple[bool, dict | str]] = {}
+
+
+def build_cursed_index(db: dict) -> dict[str, tuple[bool, dict | str]]:
+    """Merge the packages and typosquats tables, cursed packages winning on overlap."""
+    index = {name.lower(): (True, intended) for name, intended in db.get("typosquats", {}).items()}
+    index.update((name.lower(), (False, data)) for name, data in db.get("packages", {}).items())
+    return index
 
 
 def load_cursed_db():
     """Load cursed packages database from JSON file."""
-    global CURSED_DB
+    global CURSED_DB, CURSED_INDEX
     try:
-        with open(CURSED_DB_PATH) as f:
-            CURSED_DB = json.load(f)
+        with open(CURSED_DB_PATH, "rb") as f:
+            CURSED_DB = orjson.loads(f.read())
     except Exception as e:
         print(f"Warning: Could not load cursed packages database: {e}")
         CURSED_DB = {"packages": {}, "typosquats": {}}
+    CURSED_INDEX = build_cursed_index(CURSED_DB)
 
 
 load_cursed_db()
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class CursedMatch:
     """Represents a cursed package detection."""
     package: str
@@ -36,6 +56,7 @@ class CursedMatch:
     roast: str
     is_typosquat: bool = False
     intended_package: Optional[str] = None
+    order: int = field(kw_only=True, repr=False, compare=False)  # Severity rank, for worst-of
 
 
 def detect_cursed(package_name: str) -> Optional[CursedMatch]:
@@ -47,37 +68,36 @@ def detect_cursed(package_name: str) -> Optional[CursedMatch]:
     Returns:
         CursedMatch if package is cursed, None otherwise
     """
-    pkg_name = package_name.lower().strip()
-    packages = CURSED_DB.get("packages", {})
-    typosquats = CURSED_DB.get("typosquats", {})
-    
-    # Check for direct cursed package match
-    if pkg_name in packages:
-        pkg_data = packages[pkg_name]
-        roasts = pkg_data.get("roasts", ["This package has a troubled history."])
-        return CursedMatch(
-            package=package_name,
-            severity=pkg_data.get("severity", "high"),
-            incident_type=pkg_data.get("incident_type", "unknown"),
-            description=pkg_data.get("description", ""),
-            roast=random.choice(roasts),
-            is_typosquat=False
-        )
+    entry = CURSED_INDEX.get(package_name.lower().strip())
+    if entry is None:
+        return None
+    is_typosquat, data = entry
     
     # Check for typosquat
-    if pkg_name in typosquats:
-        intended = typosquats[pkg_name]
+    if is_typosquat:
         return CursedMatch(
             package=package_name,
             severity="critical",
             incident_type="typosquatting",
-            description=f"Potential typosquat of '{intended}'",
-            roast=f"'{package_name}' looks suspiciously like '{intended}'. Typosquatting detected. Check your spelling.",
+            description=f"Potential typosquat of '{data}'",
+            roast=f"'{package_name}' looks suspiciously like '{data}'. Typosquatting detected. Check your spelling.",
             is_typosquat=True,
-            intended_package=intended
+            intended_package=data,
+            order=CURSED_SEVERITY_ORDER["critical"]
         )
     
-    return None
+    # Direct cursed package match
+    roasts = data.get("roasts", ["This package has a troubled history."])
+    severity = data.get("severity", "high")
+    return CursedMatch(
+        package=package_name,
+        severity=severity,
+        incident_type=data.get("incident_type", "unknown"),
+        description=data.get("description", ""),
+        roast=random.choice(roasts),
+        is_typosquat=False,
+        order=get_cursed_severity_order(severity)
+    )
 
 
 def detect_cursed_batch(package_names: list[str]) -> list[CursedMatch]:
@@ -89,27 +109,16 @@ def detect_cursed_batch(package_names: list[str]) -> list[CursedMatch]:
     Returns:
         List of CursedMatch objects for any cursed packages found
     """
-    matches = []
-    for pkg_name in package_names:
-        match = detect_cursed(pkg_name)
-        if match:
-            matches.append(match)
-    return matches
+    return [match for match in map(detect_cursed, package_names) if match]
 
 
 def get_cursed_severity_order(severity: str) -> int:
     """Get numeric order for cursed severity (higher = worse)."""
-    order = {
-        "medium": 1,
-        "high": 2,
-        "critical": 3,
-        "legendary": 4  # Reserved for left-pad
-    }
-    return order.get(severity.lower(), 0)
+    return CURSED_SEVERITY_ORDER.get(severity.lower(), 0)
 
 
 def get_worst_cursed(matches: list[CursedMatch]) -> Optional[CursedMatch]:
     """Get the worst cursed package from a list."""
     if not matches:
         return None
-    return max(matches, key=lambda m: get_cursed_severity_order(m.severity))
+    return max(matches, key=attrgetter("order"))
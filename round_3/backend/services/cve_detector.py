@@ -1,35 +1,40 @@
 # PURPOSE: CVE detection service for PARANOID
 # Matches packages against pre-cached CVE database + live OSV.dev API
 
-import json
+import asyncio
 import re
 import logging
+import operator
 from pathlib import Path
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Optional
 import httpx
+import orjson
 
-from services.osv_client import is_version_affected
+from services.osv_client import TTLCache, is_version_affected
 
 logger = logging.getLogger(__name__)
 
-# Load CVE database
-CVE_DB_PATH = Path(__file__).parent.parent / "data" / "cves.json"
-CVE_DB: dict = {}
-
-
-def load_cve_db():
-    """Load CVE database from JSON file."""
-    global CVE_DB
-    try:
-        with open(CVE_DB_PATH) as f:
-            CVE_DB = json.load(f)
-    except Exception as e:
-        print(f"Warning: Could not load CVE database: {e}")
-        CVE_DB = {}
-
-
-load_cve_db()
+# Version parsing: drop one leading range/prefix char, then take the numeric parts
+VERSION_PREFIX_PATTERN = re.compile(r'^[v^~>=<]')
+VERSION_DIGITS_PATTERN = re.compile(r'\d+')
+
+# affected_versions operators, longest prefix first ("*" and bare versions handled separately)
+SPEC_OPERATORS = (
+    ("<=", operator.le),
+    ("<", operator.lt),
+    (">=", operator.ge),
+    (">", operator.gt),
+)
+
+# Severity rank (higher = worse)
+SEVERITY_ORDER = {
+    "low": 1,
+    "medium": 2,
+    "high": 3,
+    "critical": 4
+}
 
 # Package name aliases - map variants to canonical names in CVE DB
 PACKAGE_ALIASES = {
@@ -49,7 +54,7 @@ PACKAGE_ALIASES = {
 }
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class CVEMatch:
     """Represents a CVE match for a package."""
     package: str
@@ -58,19 +63,49 @@ class CVEMatch:
     severity: str
     description: str
     fixed_version: Optional[str] = None
+    order: int = field(kw_only=True, repr=False, compare=False)  # Severity rank, for worst-of
+
+
+@dataclass(frozen=True, slots=True)
+class PreparsedCVE:
+    """A CVE DB entry with its affected_versions spec parsed once at load time."""
+    compare: Optional[Callable[[tuple, tuple], bool]]  # None = all versions affected
+    bound: tuple
+    cve_id: str
+    severity: str
+    description: str
+    fixed_version: Optional[str]
+
+    def affects(self, pkg_ver: Optional[tuple]) -> bool:
+        """Check whether a parsed package version falls in this CVE's affected range."""
+        if pkg_ver is None or self.compare is None:
+            return True  # Assume affected if no version or all affected
+        return self.compare(pkg_ver, self.bound)
 
 
+@lru_cache(maxsize=8192)
 def parse_version(version_str: str) -> tuple:
-    """Parse version string into comparable tuple."""
+    """Parse version string into comparable tuple (cached - lockfiles repeat versions)."""
     if not version_str:
         return (0,)
     # Remove common prefixes
-    version_str = re.sub(r'^[v^~>=<]', '', version_str)
+    version_str = VERSION_PREFIX_PATTERN.sub('', version_str, count=1)
     # Extract numeric parts
-    parts = re.findall(r'\d+', version_str)
+    parts = VERSION_DIGITS_PATTERN.findall(version_str)
     return tuple(int(p) for p in parts) if parts else (0,)
 
 
+def parse_affected_spec(affected_spec: str) -> tuple[Optional[Callable[[tuple, tuple], bool]], tuple]:
+    """Split an affected_versions spec into (comparison, bound version tuple)."""
+    if affected_spec == "*":
+        return None, ()
+    for prefix, compare in SPEC_OPERATORS:
+        if affected_spec.startswith(prefix):
+            return compare, parse_version(affected_spec.lstrip("<>= "))
+    # Exact match
+    return operator.eq, parse_version(affected_spec)
+
+
 def version_matches(pkg_version: str, affected_spec: str) -> bool:
     """Check if package version matches affected version specification.
     
@@ -80,30 +115,56 @@ def version_matches(pkg_version: str, affected_spec: str) -> bool:
     - "*" - all versions affected
     - ">=1.0.0,<2.0.0" - range (simplified)
     """
-    if not pkg_version or affected_spec == "*":
-        return True  # Assume affected if no version or all affected
-    
-    pkg_ver = parse_version(pkg_version)
-    
-    # Handle less than
-    if affected_spec.startswith("<"):
-        is_equal = affected_spec.startswith("<=")
-        affected_ver = parse_version(affected_spec.lstrip("<= "))
-        if is_equal:
-            return pkg_ver <= affected_ver
-        return pkg_ver < affected_ver
-    
-    # Handle greater than (rare for CVEs)
-    if affected_spec.startswith(">"):
-        is_equal = affected_spec.startswith(">=")
-        affected_ver = parse_version(affected_spec.lstrip(">= "))
-        if is_equal:
-            return pkg_ver >= affected_ver
-        return pkg_ver > affected_ver
-    
-    # Handle exact match
-    affected_ver = parse_version(affected_spec)
-    return pkg_ver == affected_ver
+    if not pkg_version:
+        return True  # Assume affected if no version
+    compare, bound = parse_affected_spec(affected_spec)
+    return compare is None or compare(parse_version(pkg_version), bound)
+
+
+# Load CVE database
+CVE_DB_PATH = Path(__file__).parent.parent / "data" / "cves.json"
+CVE_DB: dict = {}
+# Lowercase package name (aliases included) -> pre-parsed CVEs
+CVE_INDEX: dict[str, tuple[PreparsedCVE, ...]] = {}
+
+
+def build_cve_index(db: dict) -> dict[str, tuple[PreparsedCVE, ...]]:
+    """Pre-parse every CVE entry and fold PACKAGE_ALIASES into one lookup table."""
+    index = {}
+    for name, cves in db.items():
+        if name.startswith("_") or not isinstance(cves, list):
+            continue  # Skip metadata
+        entries = []
+        for cve in cves:
+            compare, bound = parse_affected_spec(cve.get("affected_versions", "*"))
+            entries.append(PreparsedCVE(
+                compare=compare,
+                bound=bound,
+                cve_id=cve["id"],
+                severity=cve.get("severity", "unknown"),
+                description=cve.get("description", ""),
+                fixed_version=cve.get("fixed_version")
+            ))
+        index[name.lower()] = tuple(entries)
+    for alias, canonical in PACKAGE_ALIASES.items():
+        if canonical in index:
+            index[alias] = index[canonical]
+    return index
+
+
+def load_cve_db():
+    """Load CVE database from JSON file."""
+    global CVE_DB, CVE_INDEX
+    try:
+        with open(CVE_DB_PATH, "rb") as f:
+            CVE_DB = orjson.loads(f.read())
+    except Exception as e:
+        print(f"Warning: Could not load CVE database: {e}")
+        CVE_DB = {}
+    CVE_INDEX = build_cve_index(CVE_DB)
+
+
+load_cve_db()
 
 
 def detect_cves(package_name: str, version: Optional[str] = None) -> list[CVEMatch]:
@@ -116,36 +177,41 @@ def detect_cves(package_name: str, version: Optional[str] = None) -> list[CVEMat
     Returns:
         List of CVEMatch objects for matching vulnerabilities
     """
-    matches = []
-    
     # Normalize package name (lowercase, strip whitespace)
     pkg_name = package_name.lower().strip()
     
     # Skip metadata
     if pkg_name.startswith("_"):
-        return matches
-    
-    # Check for package aliases (e.g., lodash-es -> lodash)
-    canonical_name = PACKAGE_ALIASES.get(pkg_name, pkg_name)
+        return []
     
-    # Look up in CVE database
-    cves = CVE_DB.get(canonical_name, [])
+    # One lookup - aliases (e.g. lodash-es -> lodash) are folded into the index
+    cves = CVE_INDEX.get(pkg_name)
+    if not cves:
+        return []
     
-    for cve in cves:
-        affected = cve.get("affected_versions", "*")
-        
-        # Check if version is affected
-        if version_matches(version, affected):
-            matches.append(CVEMatch(
-                package=package_name,
-                version=version or "unknown",
-                cve_id=cve["id"],
-                severity=cve.get("severity", "unknown"),
-                description=cve.get("description", ""),
-                fixed_version=cve.get("fixed_version")
-            ))
-    
-    return matches
+    # Parse the package version once for all of its CVEs
+    pkg_ver = parse_version(version) if version else None
+    return [
+        CVEMatch(
+            package=package_name,
+            version=version or "unknown",
+            cve_id=cve.cve_id,
+            severity=cve.severity,
+            description=cve.description,
+            fixed_version=cve.fixed_version,
+            order=get_severity_order(cve.severity)
+        )
+        for cve in cves
+        if cve.affects(pkg_ver)
+    ]
+
+
+def unique_packages(packages: list[tuple[str, Optional[str]]]) -> list[tuple[str, Optional[str]]]:
+    """Drop repeated (name, version) pairs, keeping the first spelling of each name."""
+    unique = {}
+    for pkg_name, version in packages:
+        unique.setdefault((pkg_name.lower().strip(), version), (pkg_name, version))
+    return list(unique.values())
 
 
 def detect_cves_batch(packages: list[tuple[str, Optional[str]]]) -> list[CVEMatch]:
@@ -158,34 +224,84 @@ def detect_cves_batch(packages: list[tuple[str, Optional[str]]]) -> list[CVEMatc
         List of all CVE matches across all packages
     """
     all_matches = []
-    for pkg_name, version in packages:
-        matches = detect_cves(pkg_name, version)
-        all_matches.extend(matches)
+    for pkg_name, version in unique_packages(packages):
+        all_matches.extend(detect_cves(pkg_name, version))
     return all_matches
 
 
 def get_severity_order(severity: str) -> int:
     """Get numeric order for severity (higher = worse)."""
-    order = {
-        "low": 1,
-        "medium": 2,
-        "high": 3,
-        "critical": 4
-    }
-    return order.get(severity.lower(), 0)
+    return SEVERITY_ORDER.get(severity.lower(), 0)
 
 
 def get_worst_severity(matches: list[CVEMatch]) -> str:
     """Get the worst severity from a list of CVE matches."""
     if not matches:
         return "none"
-    return max(matches, key=lambda m: get_severity_order(m.severity)).severity
+    return max(matches, key=operator.attrgetter("order")).severity
 
 
 # --- OSV.dev Live API Integration ---
 
 OSV_API_URL = "https://api.osv.dev/v1/query"
 OSV_TIMEOUT = 3.0  # Fast timeout to not slow down roasts
+OSV_MAX_CONCURRENCY = 10  # Max in-flight OSV.dev queries per batch
+OSV_CACHE_TTL = 6 * 60 * 60  # seconds - advisories for a given version rarely change faster
+OSV_CACHE_MAX_SIZE = 4096
+
+# Shared OSV.dev clients (one per event loop) - keeps the HTTP/2 connection warm across queries
+_osv_clients: dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+
+def _drop_closed_loops() -> None:
+    """Forget the clients of event loops that have been closed (see ai_roaster._drop_closed_loops)."""
+    for loop in [loop for loop in _osv_clients if loop.is_closed()]:
+        del _osv_clients[loop]
+
+
+def get_osv_client() -> httpx.AsyncClient:
+    """Get the pooled OSV.dev client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _osv_clients.get(loop)
+    if client is None or client.is_closed:
+        _drop_closed_loops()  # A new loop is a good moment to sweep out dead ones
+        client = httpx.AsyncClient(
+            timeout=OSV_TIMEOUT,
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=40)
+        )
+        _osv_clients[loop] = client
+    return client
+
+
+# A bare numeric CVSS base score ("9.8"); vector strings ("CVSS:3.1/AV:N/...") don't match
+CVSS_SCORE_PATTERN = re.compile(r'\s*(\d+(?:\.\d+)?)\s*$')
+
+
+def cvss_score_severity(score: str) -> Optional[str]:
+    """Map a numeric CVSS base score to a severity bucket (None if not a plain score)."""
+    match = CVSS_SCORE_PATTERN.match(score)
+    if not match:
+        return None
+    base_score = float(match.group(1))
+    if base_score >= 9.0:
+        return "critical"
+    elif base_score >= 7.0:
+        return "high"
+    elif base_score >= 4.0:
+        return "medium"
+    return "low"
+
+
+# Successful OSV.dev answers keyed by (ecosystem, package, version) -> tuple of matches
+_osv_match_cache = TTLCache(ttl_seconds=OSV_CACHE_TTL, max_size=OSV_CACHE_MAX_SIZE)
+
+
+async def close_osv_client() -> None:
+    """Close the pooled OSV.dev client for the running event loop (app shutdown)."""
+    client = _osv_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
 
 
 async def query_osv(package_name: str, version: str, ecosystem: str = "npm") -> list[CVEMatch]:
@@ -199,6 +315,12 @@ async def query_osv(package_name: str, version: str, ecosystem: str = "npm") ->
     Returns:
         List of CVEMatch objects from OSV.dev
     """
+    # Repeat scans of the same lockfile skip the network entirely
+    cache_key = (ecosystem, package_name, version or "")
+    cached = _osv_match_cache.get(cache_key)
+    if cached is not None:
+        return list(cached)
+
     matches = []
     
     payload = {
@@ -213,66 +335,52 @@ async def query_osv(package_name: str, version: str, ecosystem: str = "npm") ->
         payload["package"]["version"] = version
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(OSV_API_URL, json=payload, timeout=OSV_TIMEOUT)
-            
-            if response.status_code != 200:
-                return matches
+        client = get_osv_client()
+        response = await client.post(OSV_API_URL, json=payload, timeout=OSV_TIMEOUT)
+        
+        if response.status_code != 200:
+            return matches
+        
+        data = orjson.loads(response.content)
+        vulns = data.get("vulns", [])
+        
+        for vuln in vulns:
+            # Filter by version - OSV API returns all vulns, we need to check ranges
+            if version and not is_version_affected(version, vuln, ecosystem):
+                continue
             
-            data = response.json()
-            vulns = data.get("vulns", [])
+            # Extract CVE ID from aliases
+            cve_id = vuln.get("id", "")
+            for alias in vuln.get("aliases", []):
+                if alias.startswith("CVE-"):
+                    cve_id = alias
+                    break
             
-            for vuln in vulns:
-                # Filter by version - OSV API returns all vulns, we need to check ranges
-                if version and not is_version_affected(version, vuln, ecosystem):
-                    continue
-                
-                # Extract CVE ID from aliases
-                cve_id = vuln.get("id", "")
-                for alias in vuln.get("aliases", []):
-                    if alias.startswith("CVE-"):
-                        cve_id = alias
-                        break
-                
-                # Extract severity
+            # Severity: database_specific when present, else a numeric CVSS v3 score
+            db_specific = vuln.get("database_specific") or {}
+            severity = db_specific.get("severity")
+            if severity:
+                severity = severity.lower()
+            else:
                 severity = "medium"
-                for sev in vuln.get("severity", []):
+                for sev in vuln.get("severity") or ():
                     if sev.get("type") == "CVSS_V3":
-                        score_str = sev.get("score", "")
-                        # Parse CVSS vector for severity
-                        if "/S:" in score_str:
-                            # Extract severity from CVSS vector
-                            pass
-                        # Try to get base score
-                        try:
-                            base_score = float(score_str.split("/")[0].replace("CVSS:3.1/AV:", "").split(":")[0])
-                            if base_score >= 9.0:
-                                severity = "critical"
-                            elif base_score >= 7.0:
-                                severity = "high"
-                            elif base_score >= 4.0:
-                                severity = "medium"
-                            else:
-                                severity = "low"
-                        except:
-                            pass
-                
-                # Check database_specific for severity
-                db_specific = vuln.get("database_specific", {})
-                if db_specific.get("severity"):
-                    severity = db_specific["severity"].lower()
-                
-                matches.append(CVEMatch(
-                    package=package_name,
-                    version=version or "unknown",
-                    cve_id=cve_id,
-                    severity=severity,
-                    description=vuln.get("summary", "Security vulnerability")[:200],
-                    fixed_version=None  # Would need to parse from affected ranges
-                ))
-            
-            logger.info(f"OSV.dev: {package_name}@{version} -> {len(matches)} vulns")
+                        severity = cvss_score_severity(sev.get("score", "")) or severity
+                        break
             
+            matches.append(CVEMatch(
+                package=package_name,
+                version=version or "unknown",
+                cve_id=cve_id,
+                severity=severity,
+                description=vuln.get("summary", "Security vulnerability")[:200],
+                fixed_version=None,  # Would need to parse from affected ranges
+                order=get_severity_order(severity)
+            ))
+        
+        logger.info(f"OSV.dev: {package_name}@{version} -> {len(matches)} vulns")
+        _osv_match_cache.set(cache_key, tuple(matches))
+        
     except httpx.TimeoutException:
         logger.debug(f"OSV.dev timeout for {package_name}")
     except Exception as e:
@@ -325,26 +433,34 @@ async def detect_cves_batch_live(
     Returns:
         Combined list of all CVE matches
     """
+    # Lockfiles repeat packages across sections - look each one up once
+    packages = unique_packages(packages)
+
+    # Query OSV.dev for the first max_osv_queries packages concurrently
+    semaphore = asyncio.Semaphore(OSV_MAX_CONCURRENCY)
+
+    async def query_one(pkg_name: str, version: Optional[str]) -> list[CVEMatch]:
+        async with semaphore:
+            return await query_osv(pkg_name, version, ecosystem)
+
+    live_results = await asyncio.gather(
+        *(query_one(pkg_name, version) for pkg_name, version in packages[:max_osv_queries]),
+        return_exceptions=True
+    )
+    osv_queries = len(live_results)
+
     all_matches = []
-    osv_queries = 0
-    
-    for pkg_name, version in packages:
+    for i, (pkg_name, version) in enumerate(packages):
         # Always check cached database
         cached = detect_cves(pkg_name, version)
         all_matches.extend(cached)
         
-        # Query OSV.dev for packages without cached CVEs (up to limit)
-        if osv_queries < max_osv_queries:
-            try:
-                live = await query_osv(pkg_name, version, ecosystem)
-                # Add only new CVEs not in cached
-                cached_ids = {m.cve_id for m in cached}
-                for match in live:
-                    if match.cve_id not in cached_ids:
-                        all_matches.append(match)
-                osv_queries += 1
-            except:
-                pass
+        if i < osv_queries and not isinstance(live_results[i], BaseException):
+            # Add only new CVEs not in cached
+            cached_ids = {m.cve_id for m in cached}
+            for match in live_results[i]:
+                if match.cve_id not in cached_ids:
+                    all_matches.append(match)
     
     logger.info(f"CVE detection: {len(packages)} packages, {osv_queries} OSV queries, {len(all_matches)} total CVEs")
     return all_matches
@@ -3,26 +3,68 @@
 
 from PIL import Image, ImageDraw, ImageFont
 from pathlib import Path
+import asyncio
+import atexit
+import concurrent.futures
+import functools
+import hashlib
+import itertools
+import os
+import re
+import shutil
 import textwrap
+import threading
+import time
 import random
 import urllib.parse
+from collections import OrderedDict, deque
 import httpx
 import logging
 
 logger = logging.getLogger(__name__)
 
 # H-2 Security: Constants for safe meme fetching
-MEMEGEN_ALLOWED_HOSTS = ["api.memegen.link", "memegen.link"]  # Allow CDN redirects
+MEMEGEN_ALLOWED_HOSTS = frozenset({"api.memegen.link", "memegen.link"})  # Allow CDN redirects
 MAX_MEME_SIZE = 5 * 1024 * 1024  # 5MB max
+MEME_CHUNK_SIZE = 64 * 1024  # Streamed read size, so oversized bodies are cut off early
 MEME_FETCH_TIMEOUT = 5.0  # seconds
 MAX_REDIRECTS = 3  # Limit redirect chain length
+# Known-good image URL prefixes - the host ends at the "/", so these can't be spoofed
+MEMEGEN_IMAGE_PREFIXES = tuple(f"https://{host}/images/" for host in MEMEGEN_ALLOWED_HOSTS)
+MEMEGEN_FAILURE_TTL = 30.0  # seconds - skip memegen for a template that just failed
+MEMEGEN_FAILURE_CACHE_MAX_SIZE = 64
+MEME_ENCODE_WORKERS = 2  # Background PNG encoders (zlib releases the GIL)
+MEME_ENCODE_WAIT = 10.0  # seconds get_meme_path waits for a pending encode
 
 # Output directory
 OUTPUT_DIR = Path(__file__).parent.parent / "static" / "memes"
+# Downloaded memegen images keyed by content hash of (template, top, bottom)
+MEMEGEN_CACHE_DIR = OUTPUT_DIR / "_memegen_cache"
 
 # memegen.link API - no auth required!
 MEMEGEN_API = "https://api.memegen.link/images"
 
+# memegen special character encoding, applied in one pass
+# See: https://memegen.link/docs#special-characters
+MEMEGEN_CHAR_MAP = str.maketrans({
+    "-": "--",      # hyphen -> --
+    "_": "__",      # underscore -> __
+    " ": "_",       # space -> _
+    "?": "~q",      # question mark -> ~q
+    "#": "~h",      # hash -> ~h
+    "/": "~s",      # slash -> ~s
+    ".": "~p",      # period -> ~p (mid-text only now)
+    "'": None,      # remove apostrophes (cause 404s)
+    '"': None,      # remove quotes (cause 404s)
+    ":": "~c",      # colon -> ~c
+    ";": "~c",      # semicolon -> ~c
+    "%": None,      # remove percent signs
+    ",": None,      # remove commas (cause 404s when encoded)
+    "(": None,      # remove parens
+    ")": None,
+})
+MULTI_UNDERSCORE_PATTERN = re.compile(r"_{3,}")
+
 # Meme templates with security-themed top text
 MEME_TEMPLATES = [
     {"id": "fine", "top": "This is fine", "bottom_prefix": ""},
@@ -41,39 +83,110 @@ MEME_TEMPLATES = [
 ]
 
 
+# Suffix counter for temp_path_for
+_temp_counter = itertools.count()
+
+# Set once OUTPUT_DIR exists, so later memes skip the mkdir syscall
+_output_dir_ready = False
+
+
 def ensure_output_dir():
-    """Create output directory if it doesn't exist."""
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    """Create output directory if it doesn't exist (once per process)."""
+    global _output_dir_ready
+    if not _output_dir_ready:
+        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        _output_dir_ready = True  # Benign race - mkdir is idempotent
+
+
+# Shared memegen client - created on first use, keeps the TLS connection alive between memes
+_memegen_client: httpx.Client | None = None
+_memegen_client_lock = threading.Lock()
+
+
+def get_memegen_client() -> httpx.Client:
+    """Get (or create) the pooled memegen.link client."""
+    global _memegen_client
+    with _memegen_client_lock:
+        if _memegen_client is None or _memegen_client.is_closed:
+            _memegen_client = httpx.Client(
+                timeout=MEME_FETCH_TIMEOUT,
+                follow_redirects=False,  # H-2 Security: redirects are validated by hand
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=60.0)
+            )
+            atexit.register(_memegen_client.close)
+        return _memegen_client
+
+
+def memegen_cache_path(template_id: str, top_text: str, bottom_text: str) -> Path:
+    """Content-addressed cache location for a memegen image."""
+    key = hashlib.sha256(f"{template_id}|{top_text}|{bottom_text}".encode("utf-8")).hexdigest()
+    return MEMEGEN_CACHE_DIR / f"{key}.png"
+
+
+def temp_path_for(path: Path) -> Path:
+    """Unique scratch file next to path (same filesystem, so os.replace is atomic)."""
+    # pid/thread keep workers apart; the counter separates coroutines on one thread
+    return path.with_suffix(
+        f"{path.suffix}.tmp.{os.getpid()}.{threading.get_ident()}.{next(_temp_counter)}"
+    )
+
+
+def link_or_copy(src: Path, dst: Path) -> None:
+    """Hardlink src to dst (same filesystem, no data copy), copying if linking fails."""
+    tmp_path = temp_path_for(dst)
+    try:
+        try:
+            os.link(src, tmp_path)
+        except OSError:
+            shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dst)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
 
+# Recent memegen failures per template: template_id -> time of failure (LRU order)
+_memegen_failures: OrderedDict[str, float] = OrderedDict()
+_memegen_failures_lock = threading.Lock()
 
+
+def memegen_recently_failed(template_id: str) -> bool:
+    """True if memegen failed for this template within MEMEGEN_FAILURE_TTL."""
+    with _memegen_failures_lock:
+        failed_at = _memegen_failures.get(template_id)
+        if failed_at is None:
+            return False
+        if time.monotonic() - failed_at > MEMEGEN_FAILURE_TTL:
+            del _memegen_failures[template_id]
+            return False
+        return True
+
+
+def record_memegen_failure(template_id: str) -> None:
+    """Remember a failed memegen fetch, evicting the least recently failed beyond the size cap."""
+    with _memegen_failures_lock:
+        _memegen_failures[template_id] = time.monotonic()
+        _memegen_failures.move_to_end(template_id)
+        while len(_memegen_failures) > MEMEGEN_FAILURE_CACHE_MAX_SIZE:
+            _memegen_failures.popitem(last=False)
+
+
+@functools.lru_cache(maxsize=256)
 def encode_text(text: str) -> str:
     """Encode text for memegen URL (replace spaces with _, special chars).
 
+    Cached: the static template top lines repeat on every meme.
     See: https://memegen.link/docs#special-characters
     """
     # Strip problematic trailing punctuation BEFORE encoding
     text = text.rstrip(".!?,;:")
     
-    # memegen special character encoding (order matters!)
-    text = text.replace("-", "--")      # hyphen -> --
-    text = text.replace("_", "__")      # underscore -> __
-    text = text.replace(" ", "_")       # space -> _
-    text = text.replace("?", "~q")      # question mark -> ~q
-    text = text.replace("#", "~h")      # hash -> ~h
-    text = text.replace("/", "~s")      # slash -> ~s
-    text = text.replace(".", "~p")      # period -> ~p (mid-text only now)
-    text = text.replace("'", "")        # remove apostrophes (cause 404s)
-    text = text.replace('"', "")        # remove quotes (cause 404s)
-    text = text.replace(":", "~c")      # colon -> ~c
-    text = text.replace(";", "~c")      # semicolon -> ~c
-    text = text.replace("%", "")        # remove percent signs
-    text = text.replace(",", "")        # remove commas (cause 404s when encoded)
-    text = text.replace("(", "")        # remove parens
-    text = text.replace(")", "")
-    
+    # memegen special character encoding - every replacement is keyed on the
+    # original character, so a single pass is equivalent to applying them in order
+    text = text.translate(MEMEGEN_CHAR_MAP)
+
     # Clean up any triple underscores from removed chars
-    while "___" in text:
-        text = text.replace("___", "__")
+    text = MULTI_UNDERSCORE_PATTERN.sub("__", text)
     
     # Remove problematic chars at end
     text = text.rstrip("_~")
@@ -81,8 +194,12 @@ def encode_text(text: str) -> str:
     return urllib.parse.quote(text, safe="_~-")
 
 
+@functools.lru_cache(maxsize=4096)
 def validate_memegen_url(url: str, allow_any_path: bool = False) -> bool:
-    """H-2 Security: Validate that URL is from allowed memegen hosts."""
+    """H-2 Security: Validate that URL is from allowed memegen hosts (pure, so cached)."""
+    # Fast path: the URLs we build ourselves always start with a known prefix
+    if not allow_any_path and url.startswith(MEMEGEN_IMAGE_PREFIXES):
+        return True
     try:
         parsed = urllib.parse.urlparse(url)
         host_ok = parsed.scheme == "https" and parsed.netloc in MEMEGEN_ALLOWED_HOSTS
@@ -92,18 +209,8 @@ def validate_memegen_url(url: str, allow_any_path: bool = False) -> bool:
         return False
 
 
-def generate_meme_memegen(meme_id: str, caption: str, template_id: str | None = None) -> Path | None:
-    """Generate a real meme using memegen.link API (no auth needed!).
-
-    H-2 Security: Uses httpx with timeout, content-type validation, and size limits.
-
-    Args:
-        meme_id: Unique ID for the meme file
-        caption: The roast text (goes on bottom of meme)
-        template_id: Specific template to use (e.g., "leonardo", "drake"). If None, picks random.
-    """
-    ensure_output_dir()
-
+def split_memegen_caption(caption: str, template_id: str | None) -> tuple[str, str, str]:
+    """Pick the memegen template and split the caption into (template, top, bottom) text."""
     # Use specified template or pick random
     if template_id:
         # AI specified a template - split caption between top and bottom
@@ -133,104 +240,172 @@ def generate_meme_memegen(meme_id: str, caption: str, template_id: str | None =
             bottom_text = template["bottom_prefix"] + " ".join(words[mid:]) if mid > 0 else ""
 
     # Truncate for URL length limits (memegen has ~60 char limit per line)
-    top_encoded = encode_text(top_text[:60]) if top_text else "_"
-    bottom_encoded = encode_text(bottom_text[:60]) if bottom_text else "_"
-    
+    return selected_template_id, top_text[:60], bottom_text[:60]
+
+
+def build_memegen_url(template_id: str, top_text: str, bottom_text: str) -> str | None:
+    """Build the memegen image URL, or None if it fails H-2 validation."""
+    top_encoded = encode_text(top_text) if top_text else "_"
+    bottom_encoded = encode_text(bottom_text) if bottom_text else "_"
+
     # Build URL: https://api.memegen.link/images/{template}/{top}/{bottom}.png
-    meme_url = f"{MEMEGEN_API}/{selected_template_id}/{top_encoded}/{bottom_encoded}.png"
-    
+    meme_url = f"{MEMEGEN_API}/{template_id}/{top_encoded}/{bottom_encoded}.png"
+
     # H-2 Security: Validate URL before fetching
     if not validate_memegen_url(meme_url):
         logger.warning(f"Invalid meme URL rejected: {meme_url[:100]}")
         return None
-    
+    return meme_url
+
+
+def memegen_redirect_target(response: httpx.Response) -> str | None:
+    """H-2 Security: Return a validated redirect URL, or None if the redirect is untrusted."""
+    redirect_url = response.headers.get("location", "")
+    # Handle relative redirects
+    if redirect_url.startswith("/"):
+        redirect_url = f"https://api.memegen.link{redirect_url}"
+    logger.info(f"Meme redirect to: {redirect_url[:100]}")
+    # Validate redirect destination is still memegen
+    if not validate_memegen_url(redirect_url, allow_any_path=True):
+        logger.warning(f"Blocked redirect to untrusted URL: {redirect_url[:100]}")
+        return None
+    return redirect_url
+
+
+def is_valid_meme_response(response: httpx.Response) -> bool:
+    """H-2 Security: Check status, content-type and declared size of a final memegen response."""
+    if response.status_code != 200:
+        logger.warning(f"Meme API returned {response.status_code}")
+        return False
+
+    # H-2 Security: Validate content-type is an image
+    content_type = response.headers.get("content-type", "")
+    if not content_type.startswith("image/"):
+        logger.warning(f"Invalid content-type from meme API: {content_type}")
+        return False
+
+    # H-2 Security: Reject an oversized body before reading any of it
+    declared_length = response.headers.get("content-length", "")
+    if declared_length.isdigit() and int(declared_length) > MAX_MEME_SIZE:
+        logger.warning(f"Meme too large: {declared_length} bytes")
+        return False
+
+    return True
+
+
+def download_meme(response: httpx.Response, cache_path: Path) -> bool:
+    """H-2 Security: Stream a meme body to the cache, aborting as soon as it passes MAX_MEME_SIZE."""
+    MEMEGEN_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = temp_path_for(cache_path)
     try:
-        # H-2 Security: Manually follow redirects with validation
-        current_url = meme_url
-        with httpx.Client(timeout=MEME_FETCH_TIMEOUT, follow_redirects=False) as client:
-            for redirect_count in range(MAX_REDIRECTS + 1):
-                response = client.get(current_url)
+        size = 0
+        with tmp_path.open("wb") as f:
+            for chunk in response.iter_bytes(chunk_size=MEME_CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_MEME_SIZE:
+                    logger.warning(f"Meme too large: over {MAX_MEME_SIZE} bytes")
+                    return False
+                f.write(chunk)
+        if size < 1000:
+            logger.warning(f"Meme too small (likely error): {size} bytes")
+            return False
+        os.replace(tmp_path, cache_path)
+        return True
+    finally:
+        tmp_path.unlink(missing_ok=True)
 
-                # Handle redirects safely
-                if response.status_code in (301, 302, 303, 307, 308):
-                    redirect_url = response.headers.get("location", "")
-                    # Handle relative redirects
-                    if redirect_url.startswith("/"):
-                        redirect_url = f"https://api.memegen.link{redirect_url}"
-                    logger.info(f"Meme redirect to: {redirect_url[:100]}")
-                    # Validate redirect destination is still memegen
-                    if not validate_memegen_url(redirect_url, allow_any_path=True):
-                        logger.warning(f"Blocked redirect to untrusted URL: {redirect_url[:100]}")
-                        return None
-                    current_url = redirect_url
-                    continue
 
-                # Validate final response status
-                if response.status_code != 200:
-                    logger.warning(f"Meme API returned {response.status_code}")
-                    return None
+def generate_meme_memegen(meme_id: str, caption: str, template_id: str | None = None) -> Path | None:
+    """Generate a real meme using memegen.link API (no auth needed!).
+
+    H-2 Security: Uses httpx with timeout, content-type validation, and size limits.
+
+    Args:
+        meme_id: Unique ID for the meme file
+        caption: The roast text (goes on bottom of meme)
+        template_id: Specific template to use (e.g., "leonardo", "drake"). If None, picks random.
+    """
+    ensure_output_dir()
+    selected_template_id, top_text, bottom_text = split_memegen_caption(caption, template_id)
 
-                # H-2 Security: Validate content-type is an image
-                content_type = response.headers.get("content-type", "")
-                if not content_type.startswith("image/"):
-                    logger.warning(f"Invalid content-type from meme API: {content_type}")
-                    return None
+    # Same template + text was already downloaded - skip the network entirely
+    output_path = OUTPUT_DIR / f"{meme_id}.png"
+    cache_path = memegen_cache_path(selected_template_id, top_text, bottom_text)
+    if cache_path.exists():
+        link_or_copy(cache_path, output_path)
+        return output_path
 
-                # H-2 Security: Validate size limit
-                content_length = len(response.content)
-                if content_length > MAX_MEME_SIZE:
-                    logger.warning(f"Meme too large: {content_length} bytes")
-                    return None
+    # memegen just failed for this template - go straight to the fallback
+    if memegen_recently_failed(selected_template_id):
+        return None
 
-                if content_length < 1000:
-                    logger.warning(f"Meme too small (likely error): {content_length} bytes")
-                    return None
+    meme_url = build_memegen_url(selected_template_id, top_text, bottom_text)
+    if not meme_url:
+        return None
 
-                # Write file
-                output_path = OUTPUT_DIR / f"{meme_id}.png"
-                output_path.write_bytes(response.content)
-                return output_path
+    try:
+        # H-2 Security: Manually follow redirects with validation
+        current_url = meme_url
+        client = get_memegen_client()
+        for redirect_count in range(MAX_REDIRECTS + 1):
+            with client.stream("GET", current_url) as response:
+                # Handle redirects safely
+                if response.status_code in (301, 302, 303, 307, 308):
+                    current_url = memegen_redirect_target(response)
+                    if not current_url:
+                        break
+                    continue
 
+                if not is_valid_meme_response(response):
+                    break
+                if not download_meme(response, cache_path):
+                    break
+            link_or_copy(cache_path, output_path)
+            return output_path
+        else:
             # Too many redirects
             logger.warning(f"Too many redirects ({MAX_REDIRECTS})")
-            return None
 
     except httpx.TimeoutException:
         logger.warning("Meme API timeout")
     except Exception as e:
         logger.warning(f"Meme API failed: {e}")
-    
+
+    record_memegen_failure(selected_template_id)
     return None
 
 
 TEMPLATES_DIR = Path(__file__).parent.parent / "static" / "templates"
+TEMPLATE_FORMATS = ("JPEG", "PNG", "WEBP")  # Image formats used by BUNDLED_TEMPLATES
+TEMPLATE_MAX_SIZE = 1024  # Longest edge in pixels - larger templates are downscaled on load
 
 # Track recently used templates to force variety
-_recent_templates: list[str] = []
 MAX_RECENT = 5  # Don't repeat last 5 templates
+_recent_templates: deque[str] = deque(maxlen=MAX_RECENT)  # Oldest drops off on append
+# Memes are drawn on worker threads, so selection and bookkeeping must be atomic
+_recent_templates_lock = threading.Lock()
 
 
 def get_random_template(exclude: list[str] = None) -> str:
     """Get a random template, excluding recently used ones."""
-    available = list(BUNDLED_TEMPLATES.keys())
-    
-    # Exclude recently used
-    exclude_set = set(_recent_templates)
-    if exclude:
-        exclude_set.update(exclude)
-    
-    candidates = [t for t in available if t not in exclude_set]
+    available = TEMPLATE_IDS
     
-    # If all excluded, reset and use any
-    if not candidates:
-        candidates = available
-    
-    selected = random.choice(candidates)
-    
-    # Track as recently used
-    _recent_templates.append(selected)
-    if len(_recent_templates) > MAX_RECENT:
-        _recent_templates.pop(0)
+    with _recent_templates_lock:
+        # Exclude recently used
+        exclude_set = set(_recent_templates)
+        if exclude:
+            exclude_set.update(exclude)
+        
+        candidates = [t for t in available if t not in exclude_set]
+        
+        # If all excluded, reset and use any
+        if not candidates:
+            candidates = available
+        
+        selected = random.choice(candidates)
+        
+        # Track as recently used
+        _recent_templates.append(selected)
     
     return selected
 
@@ -258,50 +433,91 @@ BUNDLED_TEMPLATES = {
     "aliens": {"file": "aliens.jpg", "text_position": "bottom"},
     "highlander": {"file": "highlander.webp", "text_position": "bottom"},
 }
+# Built once for get_random_template
+TEMPLATE_IDS = tuple(BUNDLED_TEMPLATES)
+
+
+# Meme fonts in order of preference
+MEME_FONT_PATHS = [
+    # Impact font - THE classic meme font (check macOS locations first)
+    "/System/Library/Fonts/Supplemental/Impact.ttf",  # macOS Sonoma+
+    "/Library/Fonts/Impact.ttf",  # macOS user-installed
+    "/usr/share/fonts/truetype/msttcorefonts/Impact.ttf",  # Linux with MS fonts
+    "/usr/share/fonts/truetype/impact.ttf",  # Linux alternate
+    # Bold fallbacks that still look good
+    "/System/Library/Fonts/Supplemental/Arial Bold.ttf",  # macOS
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",  # Linux
+    "/usr/share/fonts/TTF/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf",
+]
 
 
-def get_font(size: int = 32):
-    """Get a bold font for meme text - Impact style preferred."""
-    font_paths = [
-        # Impact font - THE classic meme font (check macOS locations first)
-        "/System/Library/Fonts/Supplemental/Impact.ttf",  # macOS Sonoma+
-        "/Library/Fonts/Impact.ttf",  # macOS user-installed
-        "/usr/share/fonts/truetype/msttcorefonts/Impact.ttf",  # Linux with MS fonts
-        "/usr/share/fonts/truetype/impact.ttf",  # Linux alternate
-        # Bold fallbacks that still look good
-        "/System/Library/Fonts/Supplemental/Arial Bold.ttf",  # macOS
-        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",  # Linux
-        "/usr/share/fonts/TTF/DejaVuSans-Bold.ttf",
-        "/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf",
-    ]
-    for font_path in font_paths:
+@functools.lru_cache(maxsize=1)
+def find_font_path() -> str | None:
+    """First loadable font in MEME_FONT_PATHS (probed once per process)."""
+    for font_path in MEME_FONT_PATHS:
+        if not os.path.exists(font_path):
+            continue  # A stat is cheaper than FreeType failing to open it
         try:
-            font = ImageFont.truetype(font_path, size)
-            logger.info(f"Loaded font: {font_path} at size {size}")
-            return font
+            ImageFont.truetype(font_path, 12)
+            return font_path
         except (OSError, IOError):
             continue
+    return None
+
+
+@functools.lru_cache(maxsize=32)
+def get_font(size: int = 32):
+    """Get a bold font for meme text - Impact style preferred (cached per size)."""
+    # Font size follows template width, so there is one entry per size in use
+    font_path = find_font_path()
+    if font_path:
+        logger.info(f"Loaded font: {font_path} at size {size}")
+        return ImageFont.truetype(font_path, size)
     logger.warning(f"No fonts found, using default at size {size}")
     return ImageFont.load_default(size=size)
 
 
 def draw_text_with_outline(draw: ImageDraw, text: str, x: int, y: int, font, outline: int = 5):
     """Draw single line of text with THICK black outline - classic meme style."""
-    # Use stroke parameter for cleaner outline (Pillow 8.0+)
+    # One layout pass: Pillow strokes the outline and fills the glyphs together
+    draw.text(
+        (x, y), text, font=font,
+        fill=(255, 255, 255),
+        stroke_width=outline,
+        stroke_fill=(0, 0, 0)
+    )
+
+
+@functools.lru_cache(maxsize=16)
+def average_char_width(font) -> float:
+    """Measure a font's average uppercase glyph width (cached - fonts come from get_font)."""
+    test_text = "ABCDEFGHIJKLMNOP"  # 16 chars for better average
     try:
-        draw.text(
-            (x, y), text, font=font,
-            fill=(255, 255, 255),
-            stroke_width=outline,
-            stroke_fill=(0, 0, 0)
-        )
-    except TypeError:
-        # Fallback for older Pillow - manual outline
-        for dx in range(-outline, outline + 1):
-            for dy in range(-outline, outline + 1):
-                if dx != 0 or dy != 0:
-                    draw.text((x + dx, y + dy), text, font=font, fill=(0, 0, 0))
-        draw.text((x, y), text, font=font, fill=(255, 255, 255))
+        bbox = font.getbbox(test_text)
+        return (bbox[2] - bbox[0]) / len(test_text)
+    except Exception:
+        font_size = font.size if hasattr(font, 'size') else 60
+        return font_size * 0.45  # Impact is VERY condensed
+
+
+@functools.lru_cache(maxsize=16)
+def text_wrapper(width: int) -> textwrap.TextWrapper:
+    """Reusable TextWrapper per wrap width (textwrap.wrap builds a new one each call)."""
+    return textwrap.TextWrapper(width=width)
+
+
+def draw_centered_lines(
+    draw: ImageDraw, lines: list[str], y: int, line_height: int, img_width: int, margin: int, font, outline: int
+):
+    """Draw wrapped lines horizontally centered, starting at y."""
+    # getlength is an advance-width lookup - no bbox/mask work before the real draw
+    for line in lines:
+        text_width = int(font.getlength(line))
+        # Center but ensure minimum margin on both sides
+        x = max(margin, (img_width - text_width) // 2)
+        draw_text_with_outline(draw, line, x, y, font, outline)
+        y += line_height
 
 
 def draw_meme_text(draw: ImageDraw, text: str, position: str, img_width: int, img_height: int, font):
@@ -327,13 +543,7 @@ def draw_meme_text(draw: ImageDraw, text: str, position: str, img_width: int, im
     outline = max(4, font_size // 16)  # Visible but not excessive outline
 
     # Calculate wrap width - Impact font is VERY condensed (~0.45x font size)
-    # Measure actual text to get accurate width
-    test_text = "ABCDEFGHIJKLMNOP"  # 16 chars for better average
-    try:
-        bbox = draw.textbbox((0, 0), test_text, font=font)
-        avg_char_width = (bbox[2] - bbox[0]) / len(test_text)
-    except Exception:
-        avg_char_width = font_size * 0.45  # Impact is VERY condensed
+    avg_char_width = average_char_width(font)
 
     # Fill image width minus margins (20px total for 10px on each side)
     margin = 10
@@ -348,32 +558,79 @@ def draw_meme_text(draw: ImageDraw, text: str, position: str, img_width: int, im
 
     # Draw TOP text (stays at very top)
     if top_text:
-        lines = textwrap.wrap(top_text, width=wrap_chars)[:max_lines]
-        y = margin
-        for line in lines:
-            bbox = draw.textbbox((0, 0), line, font=font)
-            text_width = bbox[2] - bbox[0]
-            # Center but ensure minimum margin on both sides
-            x = max(margin, (img_width - text_width) // 2)
-            draw_text_with_outline(draw, line, x, y, font, outline)
-            y += line_height
+        lines = text_wrapper(wrap_chars).wrap(top_text)[:max_lines]
+        draw_centered_lines(draw, lines, margin, line_height, img_width, margin, font, outline)
 
     # Draw BOTTOM text (stays at very bottom)
     if bottom_text:
-        lines = textwrap.wrap(bottom_text, width=wrap_chars)[:max_lines]
+        lines = text_wrapper(wrap_chars).wrap(bottom_text)[:max_lines]
         total_height = len(lines) * line_height
         y = img_height - total_height - margin
-        for line in lines:
-            bbox = draw.textbbox((0, 0), line, font=font)
-            text_width = bbox[2] - bbox[0]
-            # Center but ensure minimum margin on both sides
-            x = max(margin, (img_width - text_width) // 2)
-            draw_text_with_outline(draw, line, x, y, font, outline)
-            y += line_height
+        draw_centered_lines(draw, lines, y, line_height, img_width, margin, font, outline)
+
+
+# Holds every bundled template: 20 images thumbnailed to TEMPLATE_MAX_SIZE (1024px)
+# come to ~7.6M pixels, ~23 MB as 3-byte RGB
+@functools.lru_cache(maxsize=32)
+def load_template_image(template_path: Path) -> Image.Image:
+    """Decode a bundled template once; callers draw on a .copy() (a memcpy, no re-decode)."""
+    # Only the formats we bundle, so Pillow doesn't sniff every plugin
+    with Image.open(template_path, formats=TEMPLATE_FORMATS) as img:
+        # Cap oversized templates once - text drawing and PNG encode scale with pixel count
+        img.thumbnail((TEMPLATE_MAX_SIZE, TEMPLATE_MAX_SIZE), Image.Resampling.LANCZOS)
+        if img.mode == "RGB":
+            img.load()  # Already RGB (all the JPEGs) - keep the decoded image as-is
+            return img
+        return img.convert("RGB")
+
+
+@functools.lru_cache(maxsize=1)
+def blank_background() -> Image.Image:
+    """Plain background used when a template file is missing; callers draw on a .copy()."""
+    return Image.new("RGB", (600, 400), (30, 30, 30))
+
+
+# Background PNG encoding - keyed by meme ID until the file is in place
+_encode_pool = concurrent.futures.ThreadPoolExecutor(
+    max_workers=MEME_ENCODE_WORKERS, thread_name_prefix="meme-png"
+)
+_pending_encodes: dict[str, concurrent.futures.Future] = {}
+_pending_encodes_lock = threading.Lock()
+
+
+def save_png_atomic(img: Image.Image, output_path: Path) -> Path:
+    """Encode img beside output_path and rename it into place, so readers never see a partial PNG."""
+    # compress_level=1: zlib dominates encode time and level 6 buys little on these images
+    tmp_path = temp_path_for(output_path)
+    try:
+        img.save(tmp_path, "PNG", optimize=False, compress_level=1)
+        os.replace(tmp_path, output_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    logger.info(f"Meme saved: {output_path}")
+    return output_path
+
+
+def _finish_encode(meme_id: str, future: concurrent.futures.Future) -> None:
+    """Drop a finished encode from the pending table, logging any failure."""
+    with _pending_encodes_lock:
+        if _pending_encodes.get(meme_id) is future:
+            del _pending_encodes[meme_id]
+    if future.exception() is not None:
+        logger.error(f"Meme encode failed for {meme_id}: {future.exception()}")
+
+
+def pending_meme_encode(meme_id: str) -> concurrent.futures.Future | None:
+    """Return the in-flight PNG encode for meme_id, if there is one."""
+    with _pending_encodes_lock:
+        return _pending_encodes.get(meme_id)
 
 
 def generate_meme_pillow(meme_id: str, caption: str, template_id: str | None = None) -> Path:
     """Generate meme with bundled template and Pillow.
+
+    The PNG is encoded in the background - the returned path may not exist
+    yet; use pending_meme_encode() to wait for it.
     
     Args:
         meme_id: Unique ID for output file
@@ -388,11 +645,10 @@ def generate_meme_pillow(meme_id: str, caption: str, template_id: str | None = N
             # AI picked a valid template - trust it for content matching
             selected_id = template_id
             # Track as recently used for variety
-            if selected_id in _recent_templates:
-                _recent_templates.remove(selected_id)
-            _recent_templates.append(selected_id)
-            if len(_recent_templates) > MAX_RECENT:
-                _recent_templates.pop(0)
+            with _recent_templates_lock:
+                if selected_id in _recent_templates:
+                    _recent_templates.remove(selected_id)
+                _recent_templates.append(selected_id)
         else:
             # Invalid or no template - pick random excluding recently used
             selected_id = get_random_template()
@@ -403,10 +659,10 @@ def generate_meme_pillow(meme_id: str, caption: str, template_id: str | None = N
         template_path = TEMPLATES_DIR / template["file"]
         
         if template_path.exists():
-            img = Image.open(template_path).convert("RGB")
+            img = load_template_image(template_path).copy()
             logger.info(f"Using template: {selected_id}")
         else:
-            img = Image.new("RGB", (600, 400), (30, 30, 30))
+            img = blank_background().copy()
             logger.warning(f"Template not found: {template_path}, using plain background")
         
         draw = ImageDraw.Draw(img)
@@ -430,8 +686,11 @@ def generate_meme_pillow(meme_id: str, caption: str, template_id: str | None = N
         draw_meme_text(draw, caption, template["text_position"], img.width, img.height, font)
         
         output_path = OUTPUT_DIR / f"{meme_id}.png"
-        img.save(output_path, "PNG")
-        logger.info(f"Meme saved: {output_path}")
+        # The drawn image isn't touched again, so the encode can run off the request thread
+        future = _encode_pool.submit(save_png_atomic, img, output_path)
+        with _pending_encodes_lock:
+            _pending_encodes[meme_id] = future
+        future.add_done_callback(functools.partial(_finish_encode, meme_id))
         return output_path
         
     except Exception as e:
@@ -442,6 +701,9 @@ def generate_meme_pillow(meme_id: str, caption: str, template_id: str | None = N
 def generate_meme(meme_id: str, caption: str, template: str | None = None) -> Path:
     """Generate a meme using bundled templates and Pillow.
 
+    Returns the meme's eventual path - the PNG may still be encoding. Use
+    get_meme_path() or wait_for_meme() to get it once it's on disk.
+
     Args:
         meme_id: Unique ID for the meme file
         caption: The roast text
@@ -451,7 +713,36 @@ def generate_meme(meme_id: str, caption: str, template: str | None = None) -> Pa
     return generate_meme_pillow(meme_id, caption, template)
 
 
-def get_meme_path(meme_id: str) -> Path | None:
-    """Get path to existing meme if it exists."""
+async def generate_meme_async(meme_id: str, caption: str, template: str | None = None) -> Path:
+    """generate_meme on a worker thread, so template copy and text drawing don't block the event loop.
+
+    Like generate_meme, the returned path may still be pending.
+    """
+    return await asyncio.to_thread(generate_meme, meme_id, caption, template)
+
+
+async def wait_for_meme(meme_id: str) -> Path:
+    """Wait for a meme's background encode and return its path.
+
+    Re-raises the encode's exception, or FileNotFoundError if there is no
+    such meme on disk.
+    """
+    pending = pending_meme_encode(meme_id)
+    if pending is not None:
+        await asyncio.wrap_future(pending)
+    path = OUTPUT_DIR / f"{meme_id}.png"
+    if not path.exists():
+        raise FileNotFoundError(f"Meme {meme_id} was not written")
+    return path
+
+
+def get_meme_path(meme_id: str, timeout: float = MEME_ENCODE_WAIT) -> Path | None:
+    """Get path to existing meme if it exists, waiting up to timeout for a pending encode."""
+    pending = pending_meme_encode(meme_id)
+    if pending is not None:
+        try:
+            pending.result(timeout=timeout)
+        except Exception:
+            return None  # Failed (already logged by _finish_encode) or still encoding
     path = OUTPUT_DIR / f"{meme_id}.png"
     return path if path.exists() else None
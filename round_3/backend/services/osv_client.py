@@ -1,36 +1,49 @@
 # PURPOSE: OSV.dev API client for fetching real vulnerability data
 import httpx
+from collections import OrderedDict
+from collections.abc import Hashable
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
+from functools import lru_cache
 import re
 
+# Leading major.minor.patch of a semver string
+SEMVER_PATTERN = re.compile(r'^(\d+)\.(\d+)\.(\d+)')
+
 
 class TTLCache:
-    """Simple TTL cache for OSV responses."""
+    """Simple TTL cache for OSV responses, optionally capped at max_size entries (LRU)."""
 
-    def __init__(self, ttl_seconds: int = 3600):
-        self._cache: Dict[str, tuple] = {}
+    def __init__(self, ttl_seconds: int = 3600, max_size: Optional[int] = None):
+        self._cache: OrderedDict[Hashable, tuple] = OrderedDict()
         self._ttl = timedelta(seconds=ttl_seconds)
+        self._max_size = max_size
 
-    def get(self, key: str) -> Optional[Any]:
+    def get(self, key: Hashable) -> Optional[Any]:
         if key in self._cache:
             value, timestamp = self._cache[key]
             if datetime.now() - timestamp < self._ttl:
+                self._cache.move_to_end(key)
                 return value
             del self._cache[key]
         return None
 
-    def set(self, key: str, value: Any) -> None:
+    def set(self, key: Hashable, value: Any) -> None:
         self._cache[key] = (value, datetime.now())
+        self._cache.move_to_end(key)
+        if self._max_size is not None:
+            while len(self._cache) > self._max_size:
+                self._cache.popitem(last=False)
 
 
 _osv_cache = TTLCache(ttl_seconds=3600)
 
 
+@lru_cache(maxsize=8192)
 def parse_semver(version: str) -> tuple:
     """Parse semver string to tuple for comparison. Returns (major, minor, patch)."""
     # Handle version strings like "4.17.21", "0.1.0", etc.
-    match = re.match(r'^(\d+)\.(\d+)\.(\d+)', version.strip())
+    match = SEMVER_PATTERN.match(version.strip())
     if match:
         return (int(match.group(1)), int(match.group(2)), int(match.group(3)))
     # Fallback for non-semver versions
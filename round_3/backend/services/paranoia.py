@@ -2,10 +2,11 @@
 # 3 levels (CHILL, ANXIOUS, MELTDOWN), simple triggers, session-based
 
 from dataclasses import dataclass, field
-from datetime import datetime, timedelta
 from typing import Optional
+import heapq
 import random
-import uuid
+import secrets
+import time
 
 # Paranoia levels
 CHILL = 0
@@ -20,49 +21,68 @@ LEVEL_NAMES = {
 
 # Dangerous strings that trigger paranoia
 DANGEROUS_STRINGS = ["eval", "exec", "__import__", "subprocess", "os.system", "shell"]
+# The needles are lowercase ASCII, so folding only A-Z on the UTF-8 bytes matches
+# what str.lower() would find without Unicode case mapping
+DANGEROUS_BYTES = [(d, d.encode("ascii")) for d in DANGEROUS_STRINGS]
+ASCII_LOWER = bytes.maketrans(b"ABCDEFGHIJKLMNOPQRSTUVWXYZ", b"abcdefghijklmnopqrstuvwxyz")
 
 
 @dataclass
 class Session:
     session_id: str
     level: int = CHILL
-    triggers: list[str] = field(default_factory=list)
+    triggers: set[str] = field(default_factory=set)  # Deduped as they arrive
     request_count: int = 0
-    last_request: datetime = field(default_factory=datetime.now)
-    created_at: datetime = field(default_factory=datetime.now)
+    # time.monotonic() seconds, looked up per call so tests can swap in a fake clock
+    last_request: float = field(default_factory=lambda: time.monotonic())
+    created_at: float = field(default_factory=lambda: time.monotonic())
 
 
 # In-memory session store (simple dict with TTL cleanup)
 _sessions: dict[str, Session] = {}
 SESSION_TTL_MINUTES = 30
 
+# Min-heap of (last_request, session_id) - exactly one entry per live session.
+# Entries go stale when last_request moves on; they're refreshed when popped.
+_expiry_heap: list[tuple[float, str]] = []
+
 
 def _cleanup_old_sessions():
-    """Remove sessions older than TTL."""
-    cutoff = datetime.now() - timedelta(minutes=SESSION_TTL_MINUTES)
-    expired = [sid for sid, s in _sessions.items() if s.last_request < cutoff]
-    for sid in expired:
-        del _sessions[sid]
+    """Remove sessions older than TTL (only looks at heap entries past the cutoff)."""
+    cutoff = time.monotonic() - SESSION_TTL_MINUTES * 60
+    while _expiry_heap and _expiry_heap[0][0] < cutoff:
+        _, sid = heapq.heappop(_expiry_heap)
+        session = _sessions.get(sid)
+        if session is None:
+            continue
+        if session.last_request < cutoff:
+            del _sessions[sid]
+        else:
+            # Active since it was queued - requeue at its real last_request
+            heapq.heappush(_expiry_heap, (session.last_request, sid))
 
 
 def get_or_create_session(session_id: Optional[str] = None) -> Session:
     """Get existing session or create new one."""
     _cleanup_old_sessions()
 
-    if session_id and session_id in _sessions:
-        return _sessions[session_id]
+    if session_id:
+        existing = _sessions.get(session_id)
+        if existing is not None:
+            return existing
 
     # Create new session
-    new_id = session_id or str(uuid.uuid4())
+    new_id = session_id or secrets.token_hex(16)
     session = Session(session_id=new_id)
     _sessions[new_id] = session
+    heapq.heappush(_expiry_heap, (session.last_request, new_id))
     return session
 
 
 def apply_triggers(session: Session, dep_count: int, content: str) -> list[str]:
     """Apply triggers based on request, return list of triggered conditions."""
     triggered = []
-    now = datetime.now()
+    now = time.monotonic()
 
     # Trigger: Large dependency file (>100 deps)
     if dep_count > 100:
@@ -70,26 +90,26 @@ def apply_triggers(session: Session, dep_count: int, content: str) -> list[str]:
 
     # Trigger: Rapid requests (< 5 seconds since last)
     if session.request_count > 0:
-        time_since_last = (now - session.last_request).total_seconds()
+        time_since_last = now - session.last_request
         if time_since_last < 5:
             triggered.append("rapid_requests")
 
     # Trigger: Dangerous strings in input
-    content_lower = content.lower()
-    for dangerous in DANGEROUS_STRINGS:
-        if dangerous in content_lower:
+    content_lower = content.encode("utf-8", "ignore").translate(ASCII_LOWER)
+    for dangerous, needle in DANGEROUS_BYTES:
+        if needle in content_lower:
             triggered.append(f"dangerous_string:{dangerous}")
             break
 
     # Trigger: Session time > 5 minutes
-    session_duration = (now - session.created_at).total_seconds()
+    session_duration = now - session.created_at
     if session_duration > 300:  # 5 minutes
         triggered.append("long_session")
 
     # Update session
     session.request_count += 1
     session.last_request = now
-    session.triggers.extend(triggered)
+    session.triggers.update(triggered)
 
     # Escalate level based on triggers
     if triggered:
@@ -101,7 +121,7 @@ def apply_triggers(session: Session, dep_count: int, content: str) -> list[str]:
 def apply_reducers(session: Session, is_simple_lookup: bool = False) -> bool:
     """Apply reducers that can decrease paranoia. Returns True if reduced."""
     reduced = False
-    now = datetime.now()
+    now = time.monotonic()
 
     # Reducer: Simple single-package lookup
     if is_simple_lookup and session.level > CHILL:
@@ -110,7 +130,7 @@ def apply_reducers(session: Session, is_simple_lookup: bool = False) -> bool:
 
     # Reducer: Waiting 30+ seconds between requests
     if session.request_count > 0:
-        time_since_last = (now - session.last_request).total_seconds()
+        time_since_last = now - session.last_request
         if time_since_last > 30 and session.level > CHILL:
             session.level = max(session.level - 1, CHILL)
             reduced = True
@@ -123,20 +143,22 @@ def get_paranoia_state(session: Session) -> dict:
     return {
         "level": session.level,
         "level_name": LEVEL_NAMES[session.level],
-        "triggers_this_session": list(set(session.triggers)),  # Dedupe
+        "triggers_this_session": list(session.triggers),
         "request_count": session.request_count
     }
 
 
 def should_refuse_request(session: Session) -> bool:
     """At MELTDOWN level, 50% chance of refusing request."""
-    if session.level == MELTDOWN:
-        return random.random() < 0.5
-    return False
+    # A single random bit is a fair coin without building a float
+    return session.level == MELTDOWN and random.getrandbits(1) == 0
 
 
 def reset_session(session_id: str) -> Session:
     """Reset a session to CHILL level."""
     if session_id in _sessions:
-        del _sessions[session_id]
+        # Replace in place - the session already has its expiry heap entry
+        session = Session(session_id=session_id)
+        _sessions[session_id] = session
+        return session
     return get_or_create_session(session_id)
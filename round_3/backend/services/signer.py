@@ -3,15 +3,16 @@
 
 import base64
 import hashlib
-import json
+import hmac
 import logging
 
+import orjson
+
 logger = logging.getLogger(__name__)
 
 
-def _get_salt() -> str:
-    """Get the salt for hashing. Uses app name as salt."""
-    return "paranoid-roaster-v1"
+# Salt (app name) plus separator, encoded once - it prefixes every hashed payload
+SIGNING_SALT_PREFIX = b"paranoid-roaster-v1:"
 
 
 def sign_response(data: dict) -> str:
@@ -26,14 +27,14 @@ def sign_response(data: dict) -> str:
     Returns:
         Base64-encoded signature string
     """
-    # Create canonical JSON (sorted keys, no extra whitespace)
-    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    # Create canonical JSON (sorted keys, no extra whitespace) - already UTF-8 bytes
+    canonical = orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
     
-    # Hash with salt
-    to_hash = f"{_get_salt()}:{canonical}"
-    digest = hashlib.sha256(to_hash.encode('utf-8')).digest()
+    # Hash with salt - feed the prefix and payload separately, no concatenated copy
+    hasher = hashlib.sha256(SIGNING_SALT_PREFIX)
+    hasher.update(canonical)
     
-    return base64.b64encode(digest).decode('utf-8')
+    return base64.b64encode(hasher.digest()).decode('ascii')
 
 
 def get_signing_method() -> str:
@@ -52,4 +53,5 @@ def verify_signature(data: dict, signature: str) -> bool:
         True if signature is valid, False otherwise
     """
     expected = sign_response(data)
-    return signature == expected
+    # Constant-time compare, so response timing doesn't leak matching prefixes
+    return hmac.compare_digest(signature.encode('utf-8'), expected.encode('ascii'))
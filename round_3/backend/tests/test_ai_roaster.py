@@ -1,9 +1,34 @@
 # PURPOSE: Tests for AI roaster - confirms SBOM commentary handling
+import asyncio
+import orjson
+from collections import OrderedDict
 import pytest
 import sys
+import threading
 sys.path.insert(0, '/Users/jonc/Workspace/vibelympics/round_3/backend')
 
-from services.ai_roaster import AIRoastResult
+from services import ai_roaster
+from services.ai_roaster import (
+    AIRoastResult, JSONObjectScanner, MEME_TEMPLATES, PROMPT_MAX_CVES, PromptCVE,
+    TRIVIAL_RESPONSES, auto_select_level, build_prompt, build_request_body, extract_json_object
+)
+
+
+@pytest.fixture
+def mock_api(monkeypatch):
+    """Route get_client() through a MockTransport handler, closing every client handed out."""
+    clients = []
+
+    def install(handler):
+        def make_client():
+            client = ai_roaster.httpx.AsyncClient(transport=ai_roaster.httpx.MockTransport(handler))
+            clients.append(client)
+            return client
+        monkeypatch.setattr(ai_roaster, "get_client", make_client)
+
+    yield install
+    for client in clients:
+        asyncio.run(client.aclose())
 
 
 class TestAIRoastResult:
@@ -99,5 +124,318 @@ class TestSBOMCommentaryFallback:
         assert sbom_commentary == "AI-generated SBOM analysis."
 
 
+class TestAutoSelectLevel:
+    """Tests for difficulty-based model routing."""
+
+    def test_trivial_input_uses_low(self):
+        """A handful of clean deps doesn't need Sonnet."""
+        assert auto_select_level(3, 0, 0, "medium") == "low"
+
+    def test_moderate_findings_keep_requested_level(self):
+        """Mid-difficulty input respects the caller's level."""
+        assert auto_select_level(30, 2, 0, "medium") == "medium"
+
+    def test_heavy_findings_upgrade_to_high(self):
+        """Lots of CVEs and cursed packages get the best model."""
+        assert auto_select_level(200, 3, 1, "medium") == "high"
+
+
+class TestJSONObjectScanner:
+    """Tests for early-abort detection on streamed AI output."""
+
+    def test_detects_completion_across_chunks(self):
+        """Object spread over several deltas completes on the final brace."""
+        scanner = JSONObjectScanner()
+        assert scanner.feed('```json\n{"roast": "CVEs.') is False
+        assert scanner.feed(' Everywhere.", "meta": {"a": 1}') is False
+        assert scanner.feed('}\n```') is True
+        assert scanner.end == 1
+
+    def test_ignores_braces_inside_strings(self):
+        """Braces and escaped quotes in string values don't affect depth."""
+        scanner = JSONObjectScanner()
+        assert scanner.feed('{"roast": "{count} \\"deps\\" }"') is False
+        assert scanner.feed('}') is True
+
+
+class TestExtractJSONObject:
+    """Tests for pulling the roast JSON out of model output."""
+
+    def test_strips_markdown_fence(self):
+        content = 'Here you go:\n```json\n{"roast": "Fine."}\n```\nEnjoy!'
+        assert extract_json_object(content) == '{"roast": "Fine."}'
+
+    def test_plain_json_unchanged(self):
+        assert extract_json_object('{"a": {"b": 1}}') == '{"a": {"b": 1}}'
+
+    def test_no_object_returns_input(self):
+        assert extract_json_object("no json here") == "no json here"
+
+
+class TestBuildRequestBody:
+    """Tests for the pre-encoded request envelope."""
+
+    def test_matches_full_encode(self):
+        """Splicing the prompt into the cached envelope gives the same bytes."""
+        prompt = 'Quotes "here", null, {braces} and emoji 🔥'
+        expected = orjson.dumps({
+            "model": "claude-haiku-4-5-20251001",
+            "max_tokens": 256,
+            "temperature": 0.7,
+            "stream": True,
+            "system": [{"type": "text", "text": ai_roaster.SYSTEM_PROMPT,
+                        "cache_control": {"type": "ephemeral"}}],
+            "messages": [{"role": "user", "content": [
+                {"type": "text", "text": ai_roaster.PROMPT_PREFIX, "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": prompt},
+            ]}],
+        })
+        assert build_request_body("claude-haiku-4-5-20251001", 256, prompt) == expected
+
+
+class TestBuildPrompt:
+    """Tests for the per-request findings prompt."""
+
+    def test_cve_lines_capped(self):
+        """Huge scans list PROMPT_MAX_CVES lines plus a count of the rest."""
+        cves = [PromptCVE("pkg", "1.0", f"CVE-2024-{i:04d}", "high", "bad") for i in range(PROMPT_MAX_CVES + 7)]
+        prompt = build_prompt(len(cves), ["pkg"], cves, [])
+        assert f"CVE-2024-{PROMPT_MAX_CVES - 1:04d}" in prompt
+        assert f"CVE-2024-{PROMPT_MAX_CVES:04d}" not in prompt
+        assert "(+7 more)" in prompt
+        assert f"CVEs ({len(cves)};" in prompt
+
+
+class TestTrivialFastPath:
+    """Tests for the canned-roast bypass on tiny clean inputs."""
+
+    def test_canned_responses_use_valid_templates(self):
+        """Every canned roast must point at a real template."""
+        for response in TRIVIAL_RESPONSES:
+            assert response.template in MEME_TEMPLATES
+            assert response.ai_generated is False
+
+    def test_trivial_input_skips_api(self, monkeypatch):
+        """Clean input under 10 deps returns a canned roast without HTTP."""
+        monkeypatch.setattr(ai_roaster, "ANTHROPIC_API_KEY", "sk-ant-" + "x" * 32)
+        monkeypatch.setattr(ai_roaster.httpx, "AsyncClient", None)  # Any API use would blow up
+        result = asyncio.run(ai_roaster.generate_ai_roast(3, ["lodash"], [], []))
+        assert result in TRIVIAL_RESPONSES
+
+
+class TestSingleFlight:
+    """Tests for coalescing identical concurrent roast requests."""
+
+    def test_concurrent_identical_requests_share_one_call(self, monkeypatch):
+        """Two identical roasts in flight at once hit the API once."""
+        calls = []
+
+        async def fake_request(model, max_tokens, prompt):
+            calls.append(model)
+            await asyncio.sleep(0.01)
+            return AIRoastResult(roast="CVEs. Everywhere.", template="buzz", severity="high")
+
+        monkeypatch.setattr(ai_roaster, "ANTHROPIC_API_KEY", "sk-ant-" + "x" * 32)
+        monkeypatch.setattr(ai_roaster, "_request_roast", fake_request)
+        monkeypatch.setattr(ai_roaster, "_roast_cache", OrderedDict())
+        cves = [{"package": "lodash", "version": "4.17.11", "cve_id": "CVE-2019-10744",
+                 "severity": "critical", "description": "Prototype pollution"}]
+
+        async def run_both():
+            return await asyncio.gather(
+                ai_roaster.generate_ai_roast(30, ["lodash"], cves, []),
+                ai_roaster.generate_ai_roast(30, ["lodash"], cves, []),
+            )
+
+        first, second = asyncio.run(run_both())
+        assert len(calls) == 1
+        assert first is second
+        assert ai_roaster._inflight_roasts == {}
+
+
+class TestRoastCache:
+    """Tests for the local findings-keyed roast cache."""
+
+    CVES = [{"package": "lodash", "version": "4.17.11", "cve_id": "CVE-2019-10744",
+             "severity": "critical", "description": "Prototype pollution"}]
+
+    def setup_fake_api(self, monkeypatch):
+        calls = []
+
+        async def fake_request(model, max_tokens, prompt):
+            calls.append(model)
+            return AIRoastResult(roast="Cached. Roast.", template="fine", severity="high")
+
+        monkeypatch.setattr(ai_roaster, "ANTHROPIC_API_KEY", "sk-ant-" + "x" * 32)
+        monkeypatch.setattr(ai_roaster, "_request_roast", fake_request)
+        monkeypatch.setattr(ai_roaster, "_roast_cache", OrderedDict())
+        return calls
+
+    def test_repeat_findings_hit_cache(self, monkeypatch):
+        """Re-submitting the same findings doesn't call the API again."""
+        calls = self.setup_fake_api(monkeypatch)
+        first = asyncio.run(ai_roaster.generate_ai_roast(30, ["lodash"], self.CVES, []))
+        second = asyncio.run(ai_roaster.generate_ai_roast(30, ["lodash"], self.CVES, []))
+        assert len(calls) == 1
+        assert first is second
+
+    def test_no_cache_bypasses(self, monkeypatch):
+        """no_cache=True always goes to the API."""
+        calls = self.setup_fake_api(monkeypatch)
+        asyncio.run(ai_roaster.generate_ai_roast(30, ["lodash"], self.CVES, []))
+        asyncio.run(ai_roaster.generate_ai_roast(30, ["lodash"], self.CVES, [], no_cache=True))
+        assert len(calls) == 2
+
+    def test_cache_evicts_least_recently_used(self, monkeypatch):
+        """Cache never grows past its size cap."""
+        monkeypatch.setattr(ai_roaster, "_roast_cache", OrderedDict())
+        monkeypatch.setattr(ai_roaster, "ROAST_CACHE_MAX_SIZE", 2)
+        result = AIRoastResult(roast="x", template="fine", severity="low")
+        for key in ("a", "b", "c"):
+            ai_roaster.cache_roast(key, result)
+        assert ai_roaster.get_cached_roast("a") is None
+        assert ai_roaster.get_cached_roast("c") is result
+
+
+class TestRetries:
+    """Tests for retrying transient API failures."""
+
+    def setup_fake_api(self, monkeypatch, mock_api, statuses):
+        calls = []
+        roast_json = '{"roast": "Retried.", "template": "fine"}'
+        sse = b"data: " + orjson.dumps({"type": "content_block_delta", "delta": {"text": roast_json}}) + b"\n\n"
+
+        def handler(request):
+            status = statuses[len(calls)]
+            calls.append(status)
+            if status == 200:
+                return ai_roaster.httpx.Response(200, content=sse)
+            return ai_roaster.httpx.Response(status, headers={"retry-after": "0"})
+
+        monkeypatch.setattr(ai_roaster, "AI_RETRY_JITTER", 0)
+        mock_api(handler)
+        return calls
+
+    def test_rate_limit_is_retried(self, monkeypatch, mock_api):
+        """A 429 followed by success returns the roast."""
+        calls = self.setup_fake_api(monkeypatch, mock_api, [429, 503, 200])
+        result = asyncio.run(ai_roaster._request_roast("model", 256, "prompt"))
+        assert calls == [429, 503, 200]
+        assert result.roast == "Retried."
+
+    def test_timeout_is_retried(self, monkeypatch, mock_api):
+        """A first attempt that times out is retried within the AI_TIMEOUT budget."""
+        calls = []
+        roast_json = '{"roast": "Slow.", "template": "fine"}'
+        sse = b"data: " + orjson.dumps({"type": "content_block_delta", "delta": {"text": roast_json}}) + b"\n\n"
+
+        async def handler(request):
+            read_timeout = request.extensions["timeout"]["read"]
+            calls.append(read_timeout)
+            if len(calls) == 1:
+                await asyncio.sleep(read_timeout)  # Stand-in for the server never answering
+                raise ai_roaster.httpx.ReadTimeout("timed out", request=request)
+            return ai_roaster.httpx.Response(200, content=sse)
+
+        monkeypatch.setattr(ai_roaster, "AI_TIMEOUT", 0.6)
+        monkeypatch.setattr(ai_roaster, "AI_ATTEMPT_TIMEOUT", 0.2)
+        monkeypatch.setattr(ai_roaster, "AI_RETRY_JITTER", 0)
+        mock_api(handler)
+        result = asyncio.run(ai_roaster._request_roast("model", 256, "prompt"))
+        assert len(calls) == 2
+        assert calls[0] == 0.2
+        assert result.roast == "Slow."
+
+    def test_client_errors_not_retried(self, monkeypatch, mock_api):
+        """A 400 fails immediately."""
+        calls = self.setup_fake_api(monkeypatch, mock_api, [400, 200])
+        assert asyncio.run(ai_roaster._request_roast("model", 256, "prompt")) is None
+        assert calls == [400]
+
+    def test_concurrent_calls_bounded(self, monkeypatch, mock_api):
+        """No more than AI_MAX_CONCURRENCY requests are in flight at once."""
+        in_flight = []
+        peak = []
+
+        async def handler(request):
+            in_flight.append(request)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.pop()
+            return ai_roaster.httpx.Response(400)
+
+        monkeypatch.setattr(ai_roaster, "AI_MAX_CONCURRENCY", 2)
+        monkeypatch.setattr(ai_roaster, "_api_slots", {})
+        mock_api(handler)
+
+        async def run_many():
+            return await asyncio.gather(*(ai_roaster._request_roast("model", 256, f"p{i}") for i in range(5)))
+
+        assert asyncio.run(run_many()) == [None] * 5
+        assert len(peak) == 5
+        assert max(peak) == 2
+
+    def test_closed_loop_clients_dropped(self, monkeypatch):
+        """Clients and slots of loops that asyncio.run() has closed are forgotten."""
+        monkeypatch.setattr(ai_roaster, "_clients", {})
+        monkeypatch.setattr(ai_roaster, "_api_slots", {})
+
+        async def touch():
+            ai_roaster.get_client()
+            ai_roaster.get_api_slots()
+
+        async def touch_and_close():
+            await touch()
+            loop = asyncio.get_running_loop()
+            assert list(ai_roaster._clients) == [loop]
+            assert list(ai_roaster._api_slots) == [loop]
+            await ai_roaster.close_client()
+
+        asyncio.run(touch())
+        asyncio.run(touch_and_close())
+        assert ai_roaster._clients == {}
+
+    def test_retry_after_header_honored(self):
+        assert ai_roaster.retry_delay(0, "2") == 2.0
+        assert ai_roaster.retry_delay(1, "Wed, 21 Oct 2026 07:28:00 GMT") >= ai_roaster.AI_RETRY_BASE_DELAY
+
+
+class TestBatch:
+    """Tests for generate_ai_roasts."""
+
+    def test_failed_roast_maps_to_none(self, monkeypatch):
+        """An exception in one roast leaves the others' results intact."""
+        ok = AIRoastResult(roast="Fine.", template="fine", severity="low")
+
+        async def flaky_roast(dep_count, *args):
+            if dep_count == 2:
+                raise ValueError("bad finding")
+            return ok
+
+        monkeypatch.setattr(ai_roaster, "generate_ai_roast", flaky_roast)
+        batch = [(1, [], [], []), (2, [], [], []), (3, [], [], [])]
+        assert asyncio.run(ai_roaster.generate_ai_roasts(batch)) == [ok, None, ok]
+
+
+class TestSyncWrapper:
+    """Tests for generate_ai_roast_sync."""
+
+    def test_timeout_cancels_coroutine(self, monkeypatch):
+        """A timed-out sync call doesn't leave the roast running in the background."""
+        cancelled = threading.Event()
+
+        async def slow_roast(*args):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        monkeypatch.setattr(ai_roaster, "AI_SYNC_TIMEOUT", 0.05)
+        monkeypatch.setattr(ai_roaster, "generate_ai_roast", slow_roast)
+        assert ai_roaster.generate_ai_roast_sync(30, ["lodash"], [], []) is None
+        assert cancelled.wait(1)
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -5,6 +5,7 @@ sys.path.insert(0, '/Users/jonc/Workspace/vibelympics-review/round_3/backend')
 
 from services.analyzer import (
     analyze,
+    detect_input_type,
     parse_package_json,
     parse_requirements_txt,
     parse_single_package,
@@ -121,6 +122,16 @@ pkg7<7.0.0"""
         
         assert result.dep_count == 1
         assert result.dependencies[0].name == "requests"
+        assert result.dependencies[0].version == "==2.25.0"
+
+    def test_inline_comments_dropped(self):
+        content = "flask==2.0.0  # pinned for prod\r\nrequests"
+        result = parse_requirements_txt(content)
+
+        assert [(d.name, d.version) for d in result.dependencies] == [
+            ("flask", "==2.0.0"),
+            ("requests", None),
+        ]
 
 
 class TestSinglePackageParser:
@@ -172,5 +183,36 @@ class TestAnalyzeRouter:
         assert "Unsupported" in result.errors[0]
 
 
+class TestDetectInputType:
+    """Tests for input type auto-detection."""
+
+    def test_package_json_detected_from_keys(self):
+        assert detect_input_type('{"name": "app", "dependencies": {"x": "1"}}') == "package_json"
+
+    def test_package_json_keys_past_4kb_detected(self):
+        content = '{"description": "' + "x" * 5000 + '", "dependencies": {"x": "1"}}'
+        assert detect_input_type(content) == "package_json"
+
+    def test_nested_name_version_not_package_json(self):
+        content = '{"components": [{"name": "x", "version": "1"}]}'
+        assert detect_input_type(content) == "unknown"
+
+    def test_detected_package_json_parsed(self):
+        content = '{"description": "' + "x" * 5000 + '", "dependencies": {"x": "1"}}'
+        result = analyze("requirements_txt", content)
+        assert result.input_type == "package_json"
+        assert result.dep_count == 1
+
+    def test_requirements_detected(self):
+        assert detect_input_type("flask==2.0.0\nrequests>=2.25.0") == "requirements_txt"
+
+    def test_bare_less_than_not_requirements_operator(self):
+        assert detect_input_type("x < 1 and\ny < 2 too") == "unknown"
+
+    def test_go_mod_detected_without_leading_module(self):
+        content = "go 1.21\n\nmodule example.com/app\n\nrequire github.com/pkg/errors v0.9.1"
+        assert detect_input_type(content) == "go_mod"
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,40 @@
+# PURPOSE: Tests for caption selector - cursed package caption lookup
+import pytest
+
+from services import caption_selector
+
+
+class TestCursedCaptions:
+    """Tests for cursed package caption lookup."""
+
+    def setup_method(self):
+        caption_selector.cursed_captions.cache_clear()
+
+    def test_exact_name(self):
+        captions = caption_selector.caption_pool("cursed", package_name="Left-Pad")
+        assert captions is caption_selector._CURSED_INDEX["left-pad"]
+
+    def test_underscore_alias(self):
+        captions = caption_selector.caption_pool("cursed", package_name="event_stream")
+        assert captions is caption_selector._CURSED_INDEX["event-stream"]
+
+    def test_embedded_name(self):
+        """A cursed name inside a scoped/forked package still matches."""
+        captions = caption_selector.caption_pool("cursed", package_name="@scope/left-pad-fork")
+        assert captions is caption_selector._CURSED_INDEX["left-pad"]
+
+    def test_miss_scans_once(self):
+        """Repeat lookups of an unknown name are served from the cache."""
+        assert caption_selector.caption_pool("cursed", package_name="react") == []
+        assert caption_selector.caption_pool("cursed", package_name="react") == []
+        info = caption_selector.cursed_captions.cache_info()
+        assert (info.hits, info.misses) == (1, 1)
+
+    def test_reload_clears_cache(self):
+        caption_selector.caption_pool("cursed", package_name="react")
+        caption_selector.load_captions()
+        assert caption_selector.cursed_captions.cache_info().currsize == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,92 @@
+# PURPOSE: Tests for cursed detector - merged package/typosquat index resolves like the two-table lookup
+import pytest
+
+from services import cursed_detector
+
+
+def baseline_detect(db, package_name):
+    """The original detect_cursed lookup, minus the random roast: packages first, then typosquats."""
+    pkg_name = package_name.lower().strip()
+    packages = db.get("packages", {})
+    typosquats = db.get("typosquats", {})
+    if pkg_name in packages:
+        pkg_data = packages[pkg_name]
+        return (pkg_data.get("severity", "high"), pkg_data.get("incident_type", "unknown"), False, None)
+    if pkg_name in typosquats:
+        return ("critical", "typosquatting", True, typosquats[pkg_name])
+    return None
+
+
+def summarize(match):
+    if match is None:
+        return None
+    return (match.severity, match.incident_type, match.is_typosquat, match.intended_package)
+
+
+TEST_DB = {
+    "packages": {
+        "left-pad": {"severity": "legendary", "incident_type": "unpublished", "roasts": ["gone"]},
+        "lodahs": {"severity": "high", "incident_type": "malware", "roasts": ["stole keys"]},
+        "colors": {"incident_type": "sabotage"},  # No severity or roasts - defaults apply
+    },
+    "typosquats": {
+        "lodahs": "lodash",  # Also a cursed package - that entry wins
+        "crossenv": "cross-env",
+    },
+}
+
+
+@pytest.fixture
+def test_index(monkeypatch):
+    """Point detect_cursed at an index built from TEST_DB."""
+    monkeypatch.setattr(cursed_detector, "CURSED_INDEX", cursed_detector.build_cursed_index(TEST_DB))
+
+
+class TestDetectCursed:
+    """Tests for detect_cursed through the merged index."""
+
+    @pytest.mark.parametrize("name", ["left-pad", "LODAHS", " lodahs ", "crossenv", "colors", "lodash", ""])
+    def test_same_as_baseline(self, test_index, name):
+        assert summarize(cursed_detector.detect_cursed(name)) == baseline_detect(TEST_DB, name)
+
+    def test_package_beats_typosquat(self, test_index):
+        """A name in both tables is reported as the cursed package, not a typosquat."""
+        match = cursed_detector.detect_cursed("lodahs")
+        assert not match.is_typosquat
+        assert match.severity == "high"
+        assert match.roast == "stole keys"
+        assert match.order == cursed_detector.CURSED_SEVERITY_ORDER["high"]
+
+    def test_default_roast(self, test_index):
+        match = cursed_detector.detect_cursed("colors")
+        assert match.roast == "This package has a troubled history."
+
+    def test_bundled_db_same_as_baseline(self):
+        """Every name in the shipped cursed.json resolves as it did with two lookups."""
+        db = cursed_detector.CURSED_DB
+        for name in [*db["packages"], *db["typosquats"]]:
+            assert summarize(cursed_detector.detect_cursed(name)) == baseline_detect(db, name), name
+
+
+class TestWorstCursed:
+    """Tests for get_worst_cursed."""
+
+    def test_worst_by_severity(self, test_index):
+        matches = cursed_detector.detect_cursed_batch(["lodahs", "crossenv", "left-pad", "react"])
+        assert cursed_detector.get_worst_cursed(matches).package == "left-pad"
+
+    def test_first_of_equal_severity(self, test_index):
+        """Ties go to the first match, as with max() over the severity lookup."""
+        matches = cursed_detector.detect_cursed_batch(["crossenv", "CROSSENV"])
+        assert cursed_detector.get_worst_cursed(matches).package == "crossenv"
+
+    def test_order_matches_severity(self, test_index):
+        for match in cursed_detector.detect_cursed_batch(["lodahs", "crossenv", "left-pad", "colors"]):
+            assert match.order == cursed_detector.get_cursed_severity_order(match.severity)
+
+    def test_no_matches(self):
+        assert cursed_detector.get_worst_cursed([]) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
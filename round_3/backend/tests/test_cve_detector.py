@@ -0,0 +1,166 @@
+# PURPOSE: Tests for CVE detector - pre-parsed CVE index matches the original per-call matcher
+import asyncio
+import re
+
+import pytest
+
+from services import cve_detector
+
+
+def baseline_parse_version(version_str):
+    """The original parse_version, before it was cached."""
+    if not version_str:
+        return (0,)
+    version_str = re.sub(r'^[v^~>=<]', '', version_str)
+    parts = re.findall(r'\d+', version_str)
+    return tuple(int(p) for p in parts) if parts else (0,)
+
+
+def baseline_version_matches(pkg_version, affected_spec):
+    """The original version_matches, which re-parsed the spec on every call."""
+    if not pkg_version or affected_spec == "*":
+        return True
+    pkg_ver = baseline_parse_version(pkg_version)
+    if affected_spec.startswith("<"):
+        is_equal = affected_spec.startswith("<=")
+        affected_ver = baseline_parse_version(affected_spec.lstrip("<= "))
+        return pkg_ver <= affected_ver if is_equal else pkg_ver < affected_ver
+    if affected_spec.startswith(">"):
+        is_equal = affected_spec.startswith(">=")
+        affected_ver = baseline_parse_version(affected_spec.lstrip(">= "))
+        return pkg_ver >= affected_ver if is_equal else pkg_ver > affected_ver
+    return pkg_ver == baseline_parse_version(affected_spec)
+
+
+def baseline_detect_cve_ids(db, package_name, version):
+    """The original detect_cves lookup (alias resolved per call), as a list of CVE IDs."""
+    pkg_name = package_name.lower().strip()
+    if pkg_name.startswith("_"):
+        return []
+    canonical_name = cve_detector.PACKAGE_ALIASES.get(pkg_name, pkg_name)
+    return [
+        cve["id"] for cve in db.get(canonical_name, [])
+        if baseline_version_matches(version, cve.get("affected_versions", "*"))
+    ]
+
+
+SPECS = ["*", "<4.17.12", "<=4.17.12", ">=2.0.0", ">1.0", "4.17.11", "v1.2.3", "", "<abc", "latest"]
+VERSIONS = [None, "", "4.17.11", "4.17.12", "4.17.13", "^4.17.11", "~1.0.0", "1.0", "2.0.0", "latest", "abc", "v1.2.3"]
+
+TEST_DB = {
+    "_meta": {"version": 1},
+    "lodash": [
+        {"id": "CVE-L-1", "affected_versions": "<4.17.12", "severity": "high"},
+        {"id": "CVE-L-2", "affected_versions": "<=4.17.12", "severity": "critical"},
+        {"id": "CVE-L-3", "affected_versions": "*", "severity": "low"},
+        {"id": "CVE-L-4", "severity": "medium"},  # No spec - all versions
+    ],
+    "node-fetch": [
+        {"id": "CVE-N-1", "affected_versions": "2.6.0", "severity": "medium"},
+    ],
+    "underscore": [
+        {"id": "CVE-U-1", "affected_versions": "<1.12.1", "severity": "high"},
+        {"id": "CVE-U-2", "affected_versions": "", "severity": "low"},  # Empty spec is an exact (0,) match
+    ],
+}
+
+
+@pytest.fixture
+def test_index(monkeypatch):
+    """Point detect_cves at an index built from TEST_DB."""
+    monkeypatch.setattr(cve_detector, "CVE_INDEX", cve_detector.build_cve_index(TEST_DB))
+
+
+class TestVersionMatches:
+    """Tests for version_matches against the original implementation."""
+
+    @pytest.mark.parametrize("spec", SPECS)
+    @pytest.mark.parametrize("version", VERSIONS)
+    def test_same_as_baseline(self, version, spec):
+        assert cve_detector.version_matches(version, spec) == baseline_version_matches(version, spec)
+
+    @pytest.mark.parametrize("spec", SPECS)
+    @pytest.mark.parametrize("version", VERSIONS)
+    def test_preparsed_same_as_baseline(self, version, spec):
+        """PreparsedCVE.affects agrees with matching the raw spec."""
+        compare, bound = cve_detector.parse_affected_spec(spec)
+        cve = cve_detector.PreparsedCVE(compare, bound, "CVE-X", "low", "", None)
+        pkg_ver = cve_detector.parse_version(version) if version else None
+        assert cve.affects(pkg_ver) == baseline_version_matches(version, spec)
+
+    def test_less_than_excludes_bound(self):
+        assert cve_detector.version_matches("4.17.11", "<4.17.12")
+        assert not cve_detector.version_matches("4.17.12", "<4.17.12")
+        assert cve_detector.version_matches("4.17.12", "<=4.17.12")
+
+    def test_unparseable_version_is_zero(self):
+        """Versions with no digits compare as 0, so they fall under any "<" range."""
+        assert cve_detector.version_matches("latest", "<1.0.0")
+        assert not cve_detector.version_matches("latest", "1.0.0")
+
+
+class TestDetectCves:
+    """Tests for detect_cves lookups through the pre-parsed index."""
+
+    @pytest.mark.parametrize("name", [
+        "lodash", "LoDash ", "lodash-es", "lodash.merge", "isomorphic-fetch", "node-fetch",
+        "underscore.js", "jquery-slim", "_meta", "left-pad",
+    ])
+    @pytest.mark.parametrize("version", VERSIONS)
+    def test_same_as_baseline(self, test_index, name, version):
+        ids = [m.cve_id for m in cve_detector.detect_cves(name, version)]
+        assert ids == baseline_detect_cve_ids(TEST_DB, name, version)
+
+    def test_alias_reports_requested_name(self, test_index):
+        matches = cve_detector.detect_cves("lodash-es", "4.17.11")
+        assert {m.package for m in matches} == {"lodash-es"}
+        assert [m.cve_id for m in matches] == ["CVE-L-1", "CVE-L-2", "CVE-L-3", "CVE-L-4"]
+
+    def test_exact_version_spec(self, test_index):
+        assert [m.cve_id for m in cve_detector.detect_cves("whatwg-fetch", "2.6.0")] == ["CVE-N-1"]
+        assert cve_detector.detect_cves("whatwg-fetch", "2.6.1") == []
+
+    def test_bundled_db_same_as_baseline(self):
+        """Every package in the shipped cves.json matches as it did before pre-parsing."""
+        names = [name for name in cve_detector.CVE_DB if not name.startswith("_")]
+        names += list(cve_detector.PACKAGE_ALIASES)
+        for name in names:
+            for version in VERSIONS:
+                ids = [m.cve_id for m in cve_detector.detect_cves(name, version)]
+                assert ids == baseline_detect_cve_ids(cve_detector.CVE_DB, name, version), (name, version)
+
+
+class TestWorstSeverity:
+    """Tests for get_worst_severity."""
+
+    def test_worst_of_matches(self, test_index):
+        matches = cve_detector.detect_cves("lodash", "4.17.12")
+        assert [m.order for m in matches] == [cve_detector.get_severity_order(m.severity) for m in matches]
+        assert cve_detector.get_worst_severity(matches) == "critical"
+
+    def test_no_matches(self):
+        assert cve_detector.get_worst_severity([]) == "none"
+
+
+class TestOsvClient:
+    """Tests for the pooled per-loop OSV.dev client."""
+
+    def test_closed_loop_clients_dropped(self, monkeypatch):
+        """Clients of loops that asyncio.run() has closed are forgotten."""
+        monkeypatch.setattr(cve_detector, "_osv_clients", {})
+
+        async def touch():
+            cve_detector.get_osv_client()
+
+        async def touch_and_close():
+            await touch()
+            assert list(cve_detector._osv_clients) == [asyncio.get_running_loop()]
+            await cve_detector.close_osv_client()
+
+        asyncio.run(touch())
+        asyncio.run(touch_and_close())
+        assert cve_detector._osv_clients == {}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
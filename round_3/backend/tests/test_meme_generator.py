@@ -0,0 +1,68 @@
+# PURPOSE: Tests for meme generator - confirms background PNG encodes are waited on
+import asyncio
+import threading
+
+import pytest
+
+from services import meme_generator
+
+
+@pytest.fixture
+def meme_dir(tmp_path, monkeypatch):
+    """Write memes into a temporary output directory."""
+    monkeypatch.setattr(meme_generator, "OUTPUT_DIR", tmp_path)
+    monkeypatch.setattr(meme_generator, "_output_dir_ready", False)
+    return tmp_path
+
+
+class TestPendingEncode:
+    """Tests for callers of a meme whose PNG is still encoding."""
+
+    def test_get_meme_path_waits_for_pending_encode(self, meme_dir, monkeypatch):
+        """get_meme_path returns the meme once its background encode lands."""
+        release = threading.Event()
+        save_png_atomic = meme_generator.save_png_atomic
+
+        def slow_save(img, output_path):
+            release.wait(5)
+            return save_png_atomic(img, output_path)
+
+        monkeypatch.setattr(meme_generator, "save_png_atomic", slow_save)
+        path = meme_generator.generate_meme("pending1", "Such CVE", "fine")
+        assert not path.exists()
+        assert meme_generator.pending_meme_encode("pending1") is not None
+
+        threading.Timer(0.05, release.set).start()
+        assert meme_generator.get_meme_path("pending1") == path
+        assert path.exists()
+
+    def test_wait_for_meme_returns_path(self, meme_dir):
+        path = meme_generator.generate_meme("pending2", "Much dependency", "doge")
+        assert asyncio.run(meme_generator.wait_for_meme("pending2")) == path
+        assert path.exists()
+
+
+class TestFailedEncode:
+    """Tests for a background encode that fails."""
+
+    def setup_failing_encode(self, monkeypatch):
+        def broken_save(img, output_path):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(meme_generator, "save_png_atomic", broken_save)
+
+    def test_get_meme_path_returns_none(self, meme_dir, monkeypatch):
+        self.setup_failing_encode(monkeypatch)
+        meme_generator.generate_meme("failed1", "This is fine", "fine")
+        assert meme_generator.get_meme_path("failed1") is None
+
+    def test_wait_for_meme_raises(self, meme_dir, monkeypatch):
+        """The encode failure surfaces to the awaiting caller instead of a later 404."""
+        self.setup_failing_encode(monkeypatch)
+        meme_generator.generate_meme("failed2", "This is fine", "fine")
+        with pytest.raises((OSError, FileNotFoundError)):
+            asyncio.run(meme_generator.wait_for_meme("failed2"))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,109 @@
+# PURPOSE: Tests for paranoia sessions - expiry heap drops idle sessions and keeps live ones
+import types
+
+import pytest
+
+from services import paranoia
+
+TTL = paranoia.SESSION_TTL_MINUTES * 60
+
+
+class FakeClock:
+    """Stands in for time.monotonic(); only moves when advanced."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fresh session store driven by a fake clock."""
+    fake = FakeClock()
+    monkeypatch.setattr(paranoia, "time", types.SimpleNamespace(monotonic=fake.monotonic))
+    monkeypatch.setattr(paranoia, "_sessions", {})
+    monkeypatch.setattr(paranoia, "_expiry_heap", [])
+    return fake
+
+
+def sweep():
+    """Run the expiry sweep the way a request does."""
+    paranoia._cleanup_old_sessions()
+
+
+def heap_entries(session_id: str) -> list[float]:
+    return [t for t, sid in paranoia._expiry_heap if sid == session_id]
+
+
+class TestSessionExpiry:
+    """Tests for TTL cleanup of idle sessions."""
+
+    def test_idle_session_expires(self, clock):
+        session = paranoia.get_or_create_session("idle")
+        clock.advance(TTL - 1)
+        sweep()
+        assert paranoia._sessions["idle"] is session
+
+        clock.advance(2)
+        sweep()
+        assert "idle" not in paranoia._sessions
+        assert paranoia._expiry_heap == []
+
+    def test_expired_id_starts_fresh(self, clock):
+        old = paranoia.get_or_create_session("again")
+        old.level = paranoia.MELTDOWN
+        clock.advance(TTL + 1)
+        new = paranoia.get_or_create_session("again")
+        assert new is not old
+        assert new.level == paranoia.CHILL
+        assert heap_entries("again") == [clock.now]
+
+    def test_touched_session_requeued(self, clock):
+        """A session active since it was queued survives its stale entry and is requeued."""
+        session = paranoia.get_or_create_session("busy")
+        clock.advance(TTL - 10)
+        paranoia.apply_triggers(session, dep_count=1, content="")
+        touched_at = clock.now
+
+        clock.advance(20)  # Past the original entry's cutoff, not the new activity's
+        sweep()
+        assert paranoia._sessions["busy"] is session
+        assert heap_entries("busy") == [touched_at]
+
+        clock.advance(TTL - 20 + 1)  # Now idle for TTL + 1
+        sweep()
+        assert "busy" not in paranoia._sessions
+        assert paranoia._expiry_heap == []
+
+    def test_reset_session_not_evicted_by_old_entry(self, clock):
+        """reset_session keeps the old heap entry, which must not expire the new session."""
+        paranoia.get_or_create_session("reset")
+        clock.advance(TTL - 10)
+        session = paranoia.reset_session("reset")
+        reset_at = clock.now
+
+        clock.advance(20)
+        sweep()
+        assert paranoia._sessions["reset"] is session
+        assert heap_entries("reset") == [reset_at]
+
+        clock.advance(TTL - 20 + 1)
+        sweep()
+        assert "reset" not in paranoia._sessions
+
+    def test_one_heap_entry_per_session(self, clock):
+        for sid in ("a", "b", "c"):
+            paranoia.get_or_create_session(sid)
+            clock.advance(1)
+        paranoia.reset_session("a")
+        paranoia.get_or_create_session("b")
+        assert sorted(sid for _, sid in paranoia._expiry_heap) == ["a", "b", "c"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])